@@ -4,10 +4,122 @@ Script to collect Terraform files from GitHub
 
 import requests
 import os
+import re
 import time
-import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', '')  # Optional: Get from GitHub Settings → Tokens
+LOCAL_TF_DIR = os.getenv('LOCAL_TF_DIR', '')  # Optional: scan already-cloned repos instead of searching GitHub
+
+MAX_WORKERS = 8        # Parallel content downloads
+REQUEST_INTERVAL = 0.5 # Minimum seconds between requests (shared by all threads)
+
+def create_session():
+    """
+    Shared HTTP session: reuses TCP/TLS connections across requests
+    and retries rate-limit (429) and server errors with backoff
+    """
+    
+    session = requests.Session()
+    if GITHUB_TOKEN:
+        session.headers['Authorization'] = f'token {GITHUB_TOKEN}'
+    
+    retry = Retry(
+        total=3,
+        backoff_factor=2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET']
+    )
+    adapter = HTTPAdapter(
+        pool_connections=MAX_WORKERS,
+        pool_maxsize=MAX_WORKERS,
+        max_retries=retry
+    )
+    session.mount('https://', adapter)
+    
+    return session
+
+class RateLimiter:
+    """
+    Spaces requests out across threads and pauses everyone
+    when GitHub reports the quota is used up
+    """
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+    
+    def wait(self):
+        """Block until this thread may send its next request"""
+        
+        with self.lock:
+            now = time.monotonic()
+            if now < self.next_slot:
+                time.sleep(self.next_slot - now)
+                now = self.next_slot
+            self.next_slot = now + self.interval
+    
+    def update(self, response):
+        """Read X-RateLimit-* headers and back off until reset if exhausted"""
+        
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        
+        if remaining == '0' and reset:
+            pause = max(0.0, int(reset) - time.time())
+            with self.lock:
+                self.next_slot = max(self.next_slot, time.monotonic() + pause)
+
+SESSION = create_session()
+RATE_LIMITER = RateLimiter(REQUEST_INTERVAL)
+
+def raw_url(item):
+    """
+    Raw download URL for a code-search hit
+    
+    html_url looks like https://github.com/{repo}/blob/{commit}/{path};
+    the raw host serves the plain bytes, so there is no JSON/base64
+    contents payload to decode
+    """
+    
+    blob_url = item['html_url']
+    return blob_url.replace('https://github.com/', 'https://raw.githubusercontent.com/', 1).replace('/blob/', '/', 1)
+
+def fetch_file(item):
+    """
+    Download one search hit's content
+    
+    Returns:
+        Dictionary with filename, repo, content bytes (or None on failure)
+    """
+    
+    try:
+        RATE_LIMITER.wait()
+        content_response = SESSION.get(raw_url(item))
+        RATE_LIMITER.update(content_response)
+        
+        if content_response.status_code != 200:
+            print(f"❌ Error with {item['name']}: HTTP {content_response.status_code}")
+            return None
+        
+        # Keep the raw bytes; save_files writes them as-is
+        content = content_response.content
+        
+        print(f"✅ Collected: {item['name']} from {item['repository']['full_name']}")
+        
+        return {
+            'filename': item['name'],
+            'repo': item['repository']['full_name'],
+            'content': content
+        }
+    
+    except Exception as e:
+        print(f"❌ Error with {item['name']}: {e}")
+        return None
 
 def search_terraform_files(query, max_results=50):
     """
@@ -18,10 +130,6 @@ def search_terraform_files(query, max_results=50):
         max_results: Maximum files to collect
     """
     
-    headers = {}
-    if GITHUB_TOKEN:
-        headers['Authorization'] = f'token {GITHUB_TOKEN}'
-    
     url = 'https://api.github.com/search/code'
     params = {
         'q': f'{query} language:HCL',
@@ -30,7 +138,9 @@ def search_terraform_files(query, max_results=50):
     
     print(f"Searching for: {query}")
     
-    response = requests.get(url, headers=headers, params=params)
+    RATE_LIMITER.wait()
+    response = SESSION.get(url, params=params)
+    RATE_LIMITER.update(response)
     
     if response.status_code != 200:
         print(f"Error: {response.status_code}")
@@ -39,37 +149,80 @@ def search_terraform_files(query, max_results=50):
     results = response.json()
     items = results.get('items', [])
     
-    files_content = []
-    
-    for item in items[:max_results]:
-        try:
-            # Get file content
-            content_url = item['url']
-            content_response = requests.get(content_url, headers=headers)
-            
-            if content_response.status_code == 200:
-                content_data = content_response.json()
-                
-                # Decode base64 content
-                encoded_content = content_data.get('content', '')
-                decoded = base64.b64decode(encoded_content).decode('utf-8')
-                
-                files_content.append({
-                    'filename': item['name'],
-                    'repo': item['repository']['full_name'],
-                    'content': decoded
-                })
-                
-                print(f"✅ Collected: {item['name']} from {item['repository']['full_name']}")
-            
-            # Rate limiting
-            time.sleep(2)
-            
-        except Exception as e:
-            print(f"❌ Error with {item['name']}: {e}")
-            continue
-    
-    return files_content
+    # Download contents in parallel; RATE_LIMITER keeps us within GitHub limits
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        fetched = list(executor.map(fetch_file, items[:max_results]))
+    
+    return [f for f in fetched if f is not None]
+
+# Local mode: the same safe/risky patterns as the GitHub queries below,
+# each compiled once into a single alternation so a file is scanned in one pass
+RISKY_PATTERN = re.compile(
+    rb'acl\s*=\s*"public-read'
+    rb'|0\.0\.0\.0/0'
+    rb'|publicly_accessible\s*=\s*true',
+    re.IGNORECASE
+)
+SAFE_PATTERN = re.compile(
+    rb'acl\s*=\s*"private"'
+    rb'|storage_encrypted\s*=\s*true'
+    rb'|server_side_encryption_configuration',
+    re.IGNORECASE
+)
+
+def find_tf_files(root):
+    """Recursively yield paths of .tf files under root"""
+    
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith('.'):
+                    yield from find_tf_files(entry.path)
+            elif entry.name.endswith('.tf'):
+                yield entry.path
+
+def classify_local_file(path):
+    """
+    Read one local .tf file and bucket it by pattern
+    
+    Returns:
+        (category, file_data) where category is 'risky', 'safe' or None
+    """
+    
+    with open(path, 'rb') as f:
+        content = f.read()
+    
+    file_data = {
+        'filename': os.path.basename(path),
+        'repo': os.path.dirname(path),
+        'content': content
+    }
+    
+    # Any risky pattern wins over safe ones
+    if RISKY_PATTERN.search(content):
+        return 'risky', file_data
+    if SAFE_PATTERN.search(content):
+        return 'safe', file_data
+    return None, file_data
+
+def collect_local_files(root):
+    """
+    Collect safe/risky Terraform files from a local directory tree
+    
+    Returns:
+        (safe_files, risky_files)
+    """
+    
+    safe, risky = [], []
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for category, file_data in executor.map(classify_local_file, find_tf_files(root)):
+            if category == 'risky':
+                risky.append(file_data)
+            elif category == 'safe':
+                safe.append(file_data)
+    
+    return safe, risky
 
 def save_files(files, category='safe'):
     """Save collected files"""
@@ -80,50 +233,60 @@ def save_files(files, category='safe'):
         filename = f"github_{category}_{i+1:03d}.tf"
         filepath = f"data/raw/{category}/{filename}"
         
-        with open(filepath, 'w') as f:
+        with open(filepath, 'wb') as f:
             f.write(file_data['content'])
         
         print(f"Saved: {filepath}")
 
 if __name__ == '__main__':
     
-    print("=" * 60)
-    print("Collecting SAFE configurations...")
-    print("=" * 60)
-    
-    # Safe patterns
-    safe_queries = [
-        'resource aws_s3_bucket acl private encryption',
-        'resource aws_rds_instance encrypted storage_encrypted true',
-        'resource aws_security_group ingress specific'
-    ]
-    
-    all_safe = []
-    for query in safe_queries:
-        files = search_terraform_files(query, max_results=30)
-        all_safe.extend(files)
-        time.sleep(5)  # Avoid rate limiting
-    
-    save_files(all_safe[:100], 'safe')
+    if LOCAL_TF_DIR:
+        print("=" * 60)
+        print(f"Scanning local Terraform files in {LOCAL_TF_DIR}...")
+        print("=" * 60)
+        
+        all_safe, all_risky = collect_local_files(LOCAL_TF_DIR)
+        save_files(all_safe[:100], 'safe')
+        save_files(all_risky[:100], 'risky')
     
-    print("\n" + "=" * 60)
-    print("Collecting RISKY configurations...")
-    print("=" * 60)
-    
-    # Risky patterns
-    risky_queries = [
-        'resource aws_s3_bucket acl public-read',
-        'resource aws_security_group ingress 0.0.0.0/0',
-        'resource aws_db_instance publicly_accessible true'
-    ]
-    
-    all_risky = []
-    for query in risky_queries:
-        files = search_terraform_files(query, max_results=30)
-        all_risky.extend(files)
-        time.sleep(5)
-    
-    save_files(all_risky[:100], 'risky')
+    else:
+        print("=" * 60)
+        print("Collecting SAFE configurations...")
+        print("=" * 60)
+        
+        # Safe patterns
+        safe_queries = [
+            'resource aws_s3_bucket acl private encryption',
+            'resource aws_rds_instance encrypted storage_encrypted true',
+            'resource aws_security_group ingress specific'
+        ]
+        
+        all_safe = []
+        for query in safe_queries:
+            files = search_terraform_files(query, max_results=30)
+            all_safe.extend(files)
+            time.sleep(5)  # Avoid rate limiting
+        
+        save_files(all_safe[:100], 'safe')
+        
+        print("\n" + "=" * 60)
+        print("Collecting RISKY configurations...")
+        print("=" * 60)
+        
+        # Risky patterns
+        risky_queries = [
+            'resource aws_s3_bucket acl public-read',
+            'resource aws_security_group ingress 0.0.0.0/0',
+            'resource aws_db_instance publicly_accessible true'
+        ]
+        
+        all_risky = []
+        for query in risky_queries:
+            files = search_terraform_files(query, max_results=30)
+            all_risky.extend(files)
+            time.sleep(5)
+        
+        save_files(all_risky[:100], 'risky')
     
     print("\n" + "=" * 60)
     print("Collection Complete!")
@@ -4,6 +4,9 @@ No GitHub API needed - creates synthetic examples
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 16  # File writes release the GIL, so threads overlap the I/O
 
 # Safe configurations (25 examples)
 SAFE_EXAMPLES = [
@@ -241,6 +244,23 @@ resource "aws_iam_user" "admin_user" {
     },
 ]
 
+def write_example(filepath, content):
+    """Write one example as a single pre-encoded binary write"""
+    
+    payload = content.strip().encode('utf-8')
+    with open(filepath, 'wb') as f:
+        f.write(payload)
+
+def write_examples(directory, examples):
+    """Write a batch of examples concurrently"""
+    
+    paths = [f"{directory}/{example['name']}" for example in examples]
+    contents = [example['content'] for example in examples]
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # list() so any write error is raised here
+        list(executor.map(write_example, paths, contents))
+
 def generate_all_examples():
     """Generate all example files"""
     
@@ -254,19 +274,13 @@ def generate_all_examples():
     
     # Generate safe examples
     print("\nGenerating SAFE examples...")
-    for example in SAFE_EXAMPLES:
-        filepath = f"data/raw/safe/{example['name']}"
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(example['content'].strip())
-        print(f"  ✅ {example['name']}")
+    write_examples('data/raw/safe', SAFE_EXAMPLES)
+    print("\n".join(f"  ✅ {example['name']}" for example in SAFE_EXAMPLES))
     
     # Generate risky examples
     print("\nGenerating RISKY examples...")
-    for example in RISKY_EXAMPLES:
-        filepath = f"data/raw/risky/{example['name']}"
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(example['content'].strip())
-        print(f"  ✅ {example['name']}")
+    write_examples('data/raw/risky', RISKY_EXAMPLES)
+    print("\n".join(f"  ✅ {example['name']}" for example in RISKY_EXAMPLES))
     
     # Summary
     print("\n" + "=" * 60)
@@ -3,44 +3,65 @@ Verify collected dataset
 """
 
 import os
-import glob
+
+def scan_tf_files(directory):
+    """
+    Count .tf files in a directory with a single os.scandir pass
+    
+    Returns:
+        (count, path of first .tf file or None)
+    """
+    
+    if not os.path.isdir(directory):
+        return 0, None
+    
+    count = 0
+    sample = None
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith('.tf'):
+                count += 1
+                if sample is None:
+                    sample = entry.path
+    
+    return count, sample
 
 def verify_dataset():
     print("🔍 Verifying dataset...\n")
     
     # Count files
-    safe_files = glob.glob('data/raw/safe/*.tf')
-    risky_files = glob.glob('data/raw/risky/*.tf')
+    safe_count, safe_sample = scan_tf_files('data/raw/safe')
+    risky_count, risky_sample = scan_tf_files('data/raw/risky')
     
     print(f"📊 File Counts:")
-    print(f"   Safe: {len(safe_files)}")
-    print(f"   Risky: {len(risky_files)}")
-    print(f"   Total: {len(safe_files) + len(risky_files)}")
+    print(f"   Safe: {safe_count}")
+    print(f"   Risky: {risky_count}")
+    print(f"   Total: {safe_count + risky_count}")
     
     # Check CSV
     if os.path.exists('data/labels.csv'):
         with open('data/labels.csv', 'r') as f:
-            lines = f.readlines()
-        print(f"\n📋 labels.csv: {len(lines)-1} entries")
+            line_count = sum(1 for _ in f)
+        print(f"\n📋 labels.csv: {line_count-1} entries")
     
     # Sample content
     print(f"\n📄 Sample safe file:")
-    if safe_files:
-        with open(safe_files[0], 'r') as f:
-            print(f.read()[:200] + "...")
+    if safe_sample:
+        with open(safe_sample, 'r') as f:
+            print(f.read(200) + "...")
     
     print(f"\n⚠️  Sample risky file:")
-    if risky_files:
-        with open(risky_files[0], 'r') as f:
-            print(f.read()[:200] + "...")
+    if risky_sample:
+        with open(risky_sample, 'r') as f:
+            print(f.read(200) + "...")
     
     # Status
-    if len(safe_files) >= 50 and len(risky_files) >= 50:
+    if safe_count >= 50 and risky_count >= 50:
         print(f"\n✅ Dataset is complete and ready!")
     else:
         print(f"\n⚠️  Need more files:")
-        print(f"   Safe: {50 - len(safe_files)} more needed")
-        print(f"   Risky: {50 - len(risky_files)} more needed")
+        print(f"   Safe: {50 - safe_count} more needed")
+        print(f"   Risky: {50 - risky_count} more needed")
 
 if __name__ == '__main__':
     verify_dataset()
\ No newline at end of file
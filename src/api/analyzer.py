@@ -7,13 +7,11 @@ Complete analysis pipeline:
 """
 
 import sys
-import os
-import tempfile  # ← ADDED THIS
 sys.path.append('src')
 
-from ingestion.parse_terraform import parse_terraform_file
+from ingestion.parse_terraform import parse_terraform_file, parse_terraform_string
 from ingestion.extract_features import extract_security_features
-from ml_model.test_model import predict_risk
+from ml_model.test_model import predict_risk_batch
 
 def analyze_terraform(file_path=None, terraform_code=None):
     """
@@ -31,36 +29,24 @@ def analyze_terraform(file_path=None, terraform_code=None):
     if file_path:
         parsed = parse_terraform_file(file_path)
     elif terraform_code:
-        # FIXED: Use system temp directory (works on Windows)
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, 'temp_terraform.tf')
-        
-        with open(temp_path, 'w') as f:
-            f.write(terraform_code)
-        
-        parsed = parse_terraform_file(temp_path)
-        
-        # Clean up temp file
-        try:
-            os.remove(temp_path)
-        except:
-            pass
+        # Parse in memory: no temp file to write, re-read or collide on
+        parsed = parse_terraform_string(terraform_code)
     else:
         return {"error": "No input provided"}
     
     if not parsed or not parsed['resources']:
         return {"error": "No resources found in Terraform code"}
     
+    # Step 2: Extract features for every resource
+    all_features = [extract_security_features(r) for r in parsed['resources']]
+    
+    # Step 3: ML Prediction - one model call for the whole file
+    predictions = predict_risk_batch(all_features)
+    
     # Analyze each resource
     results = []
     
-    for resource in parsed['resources']:
-        # Step 2: Extract features
-        features = extract_security_features(resource)
-        
-        # Step 3: ML Prediction
-        prediction = predict_risk(features)
-        
+    for resource, features, prediction in zip(parsed['resources'], all_features, predictions):
         # Step 4: Generate human-readable explanation
         explanation = generate_explanation(features, prediction)
         
@@ -82,7 +68,7 @@ def analyze_terraform(file_path=None, terraform_code=None):
         results.append(result)
     
     # Determine overall risk
-    max_risk = max([r['risk_score'] for r in results])
+    max_risk = max(r['risk_score'] for r in results)
     
     if max_risk > 0.7:
         overall_decision = "BLOCK"
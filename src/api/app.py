@@ -3,33 +3,49 @@ Production-ready Flask API
 """
 
 from flask import Flask, request, jsonify, render_template
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from logger import logger
-import os
 import sys
 sys.path.append('src')
 
 from api.hybrid_analyzer import HybridAnalyzer
+from api.logger import setup_logger
 import logging
-<<<<<<< HEAD
-<<<<<<< HEAD
 
-=======
->>>>>>> 0a16561e50242007f6cdd72c489ef569313b125c
-=======
+try:
+    import orjson
+except ImportError:  # Optional - falls back to Flask's stdlib json
+    orjson = None
 
->>>>>>> 198280a7dda133577688e5b0e0a93b80391fc3de
+class ORJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson (C implementation, serializes numpy scalars)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__, 
             template_folder='../../frontend/templates',
             static_folder='../../frontend/static')
 CORS(app)  # Allow requests from web browser
-# Logging setup
-logging.basicConfig(level=logging.INFO)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+# Logging setup: setup_logger only attaches the console and buffered,
+# rotating logs/api.log handlers to this module's logger
 logger = logging.getLogger(__name__)
+setup_logger(__name__)
 
-# Create hybrid analyzer instance
+# Create hybrid analyzer instance and warm it up at import, so that with
+# `gunicorn --preload` the work happens once in the master process and
+# the first request in each worker doesn't pay the cold-start cost
 hybrid_analyzer = HybridAnalyzer()
+hybrid_analyzer.warm_up()
 
 # Route 1: Homepage
 @app.route('/')
@@ -73,14 +89,6 @@ def analyze():
         logger.error(f"Analysis failed: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
-<<<<<<< HEAD
-<<<<<<< HEAD
-=======
-
->>>>>>> 0a16561e50242007f6cdd72c489ef569313b125c
-
-=======
->>>>>>> 198280a7dda133577688e5b0e0a93b80391fc3de
 # Route 4: Upload file endpoint
 @app.route('/api/analyze-file', methods=['POST'])
 def analyze_file():
@@ -101,23 +109,15 @@ def analyze_file():
         if not file.filename.endswith('.tf'):
             return jsonify({"error": "File must be .tf (Terraform)"}), 400
         
-        # Save temporarily
-        temp_path = f'/tmp/{file.filename}'
-        file.save(temp_path)
+        # Read the upload straight from the request stream - nothing
+        # touches disk, and the client-supplied filename is never used as a path
+        try:
+            terraform_code = file.stream.read().decode('utf-8')
+        except UnicodeDecodeError:
+            return jsonify({"error": "File must be UTF-8 text"}), 400
         
         # Analyze
-        result = hybrid_analyzer.analyze_file(temp_path)
-<<<<<<< HEAD
-<<<<<<< HEAD
-
-=======
->>>>>>> 0a16561e50242007f6cdd72c489ef569313b125c
-=======
-
->>>>>>> 198280a7dda133577688e5b0e0a93b80391fc3de
-        
-        # Clean up
-        os.remove(temp_path)
+        result = hybrid_analyzer.analyze_complete(terraform_code)
         
         return jsonify(result)
     
@@ -139,18 +139,24 @@ def analyze_batch():
         
         configurations = data['configurations']
         
-        results = []
-        for i, config in enumerate(configurations):
-            result = hybrid_analyzer.analyze_complete(config['code'])
+        # One batched analysis (single ML call) instead of one call per config
+        results = hybrid_analyzer.analyze_batch([config['code'] for config in configurations])
+        for i, (config, result) in enumerate(zip(configurations, results)):
             result['config_id'] = config.get('id', f'config_{i}')
-            results.append(result)
         
-        # Summary statistics
+        # Summary statistics (single pass; hybrid results carry 'decision')
+        blocked = warnings = allowed = 0
+        for r in results:
+            decision = r.get('decision')
+            blocked += decision == 'BLOCK'
+            warnings += decision == 'WARN'
+            allowed += decision == 'ALLOW'
+        
         summary = {
             'total': len(results),
-            'blocked': len([r for r in results if r['overall_decision'] == 'BLOCK']),
-            'warnings': len([r for r in results if r['overall_decision'] == 'WARN']),
-            'allowed': len([r for r in results if r['overall_decision'] == 'ALLOW'])
+            'blocked': blocked,
+            'warnings': warnings,
+            'allowed': allowed
         }
         
         return jsonify({
@@ -171,7 +177,9 @@ def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
-    # Production settings
+    # Local development only - in production run under gunicorn
+    # (see docs/deployment_guide.md), which gives multiple worker
+    # processes with a thread pool each instead of Werkzeug's dev server
     app.run(
         host='0.0.0.0',  # Listen on all network interfaces
         port=5000,
@@ -3,46 +3,155 @@ Hybrid Analyzer - Combines ML + LLM
 Week 2 Innovation
 """
 
+import copy
+import hashlib
 import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append('src')
 
-from ingestion.parse_terraform import parse_terraform_file
+from ingestion.parse_terraform import parse_terraform_string
 from ingestion.extract_features import extract_security_features
-from ml_model.test_model import predict_risk
+from ml_model.test_model import predict_risk, predict_risk_batch
 from llm.llm_analyzer import LLMAnalyzer
 
 class HybridAnalyzer:
     """Combines ML pattern matching with LLM context understanding"""
     
-    def __init__(self):
+    def __init__(self, cache_size=1024, max_llm_calls=8):
         self.llm = LLMAnalyzer()
         self.version = "2.0"
+        
+        # Upper bound on concurrent LLM requests across all callers
+        self.max_llm_calls = max_llm_calls
+        self._llm_slots = threading.BoundedSemaphore(max_llm_calls)
+        
+        # Results of analyze_complete, keyed by code hash (LRU)
+        self.cache_size = cache_size
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+    
+    def warm_up(self):
+        """
+        Pay one-time costs (HCL grammar build, model unpickling) up front
+        
+        Runs parse + ML only; no LLM call is made.
+        """
+        
+        resource, features = self._prepare('resource "aws_s3_bucket" "warmup" {}')
+        if resource is not None:
+            predict_risk(features)
+    
+    def analyze_complete(self, terraform_code):
+        """
+        Hybrid analysis, memoized by content hash
+        
+        Identical code (retries, repeated batch entries) skips the
+        parse, ML and LLM steps entirely.
+        """
+        
+        key = self._cache_key(terraform_code)
+        
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        result = self.analyze(terraform_code)
+        self._cache_put(key, result)
+        
+        # Callers may add keys (e.g. config_id) or edit the nested resource
+        # and lists, so hand out a deep copy
+        return copy.deepcopy(result)
+    
+    def analyze_batch(self, codes):
+        """
+        Analyze many configurations, scoring all of them with one ML call
+        
+        Args:
+            codes: List of Terraform code strings
+        
+        Returns:
+            List of results, in the same order as codes
+        """
+        
+        results = [None] * len(codes)
+        pending = []     # (index, key, code, resource, features)
+        duplicates = []  # (index, index of first occurrence)
+        first_seen = {}
+        
+        for i, code in enumerate(codes):
+            key = self._cache_key(code)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[i] = cached
+                continue
+            
+            # Same code twice in one batch: analyze it once
+            if key in first_seen:
+                duplicates.append((i, first_seen[key]))
+                continue
+            first_seen[key] = i
+            
+            resource, features = self._prepare(code)
+            if resource is None:
+                results[i] = {"error": "No resources found"}
+            else:
+                pending.append((i, key, code, resource, features))
+        
+        # ML prediction for every pending config in a single pass
+        ml_results = predict_risk_batch([p[4] for p in pending]) if pending else []
+        
+        # LLM calls are network-bound, so overlap them
+        def combine(item, ml_result):
+            _, _, code, resource, features = item
+            return self._combine(code, resource, features, ml_result['risk_score'])
+        
+        with ThreadPoolExecutor(max_workers=self.max_llm_calls) as executor:
+            combined = list(executor.map(combine, pending, ml_results))
+        
+        for (i, key, _, _, _), result in zip(pending, combined):
+            self._cache_put(key, result)
+            results[i] = copy.deepcopy(result)
+        
+        for i, first in duplicates:
+            results[i] = copy.deepcopy(results[first])
+        
+        return results
     
     def analyze(self, terraform_code):
         """Complete hybrid analysis"""
         
-        # Parse
-        temp_path = '/tmp/analysis.tf'
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            f.write(terraform_code)
+        resource, features = self._prepare(terraform_code)
+        if resource is None:
+            return {"error": "No resources found"}
+        
+        # ML prediction
+        ml_result = predict_risk(features)
         
-        parsed = parse_terraform_file(temp_path)
+        return self._combine(terraform_code, resource, features, ml_result['risk_score'])
+    
+    def _prepare(self, terraform_code):
+        """Parse code and extract features of the first resource"""
+        
+        # Parse (in memory, so concurrent requests never share a temp file)
+        parsed = parse_terraform_string(terraform_code)
         if not parsed or not parsed['resources']:
-            return {"error": "No resources found"}
+            return None, None
         
         resource = parsed['resources'][0]
-        features = extract_security_features(resource)
+        return resource, extract_security_features(resource)
+    
+    def _combine(self, terraform_code, resource, features, ml_score):
+        """Run the LLM step and fuse it with the ML score"""
         
-        # ML prediction
-        ml_result = predict_risk(features)
-        ml_score = ml_result['risk_score']
-        
-        # LLM analysis
-        llm_result = self.llm.analyze_intent(
-            terraform_code,
-            resource['name'],
-            features
-        )
+        # LLM analysis (bounded so batches can't flood the provider)
+        with self._llm_slots:
+            llm_result = self.llm.analyze_intent(
+                terraform_code,
+                resource['name'],
+                features
+            )
         llm_score = llm_result['llm_risk_score']
         
         # Fusion
@@ -65,6 +174,32 @@ class HybridAnalyzer:
             }
         }
     
+    def _cache_key(self, terraform_code):
+        """Content hash used as the result-cache key"""
+        return hashlib.blake2b(terraform_code.encode('utf-8'), digest_size=16).digest()
+    
+    def _cache_get(self, key):
+        """Deep copy of a cached result, or None"""
+        
+        with self._results_lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return copy.deepcopy(self._results[key])
+        return None
+    
+    def _cache_put(self, key, result):
+        """Store a result, evicting the least recently used entry"""
+        
+        # Don't cache failures - they may be transient
+        if 'error' in result:
+            return
+        
+        with self._results_lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+    
     def _fuse_scores(self, ml_score, llm_score, llm_result):
         """Intelligent fusion algorithm"""
         
@@ -3,8 +3,70 @@ Logging configuration for API
 """
 
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import threading
+import time
+
+FLUSH_INTERVAL = 1.0     # seconds between buffered log flushes
+BUFFER_SIZE = 8192       # bytes of log lines held before a write
+
+def _flush_periodically(handler, interval):
+    while True:
+        time.sleep(interval)
+        handler.flush()
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Size-rotating file handler that doesn't flush after every record
+    
+    Lines collect in a BUFFER_SIZE buffer and reach the file when it fills,
+    every FLUSH_INTERVAL seconds, right away for ERROR and above, and on
+    shutdown. The file size is tracked here because the base class checks
+    it with seek/tell, which would flush on every record.
+    """
+    
+    def __init__(self, filename, maxBytes=0, backupCount=0):
+        super().__init__(
+            filename, maxBytes=maxBytes, backupCount=backupCount,
+            encoding='utf-8', delay=True
+        )
+        self.size = 0
+        
+        threading.Thread(
+            target=_flush_periodically,
+            args=(self, FLUSH_INTERVAL),
+            daemon=True
+        ).start()
+    
+    def _open(self):
+        stream = open(
+            self.baseFilename, self.mode,
+            buffering=BUFFER_SIZE, encoding=self.encoding, errors=self.errors
+        )
+        self.size = os.fstat(stream.fileno()).st_size
+        return stream
+    
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            
+            msg = self.format(record) + self.terminator
+            length = len(msg.encode(self.encoding))
+            
+            if self.maxBytes > 0 and self.size and self.size + length >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            
+            self.stream.write(msg)
+            self.size += length
+            
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
 
 def setup_logger(name='cloud_security_api'):
     """
@@ -16,7 +78,13 @@ def setup_logger(name='cloud_security_api'):
     
     # Create logger
     logger = logging.getLogger(name)
+    
+    # Already configured (module imported twice, reloader, pytest)
+    if logger.handlers:
+        return logger
+    
     logger.setLevel(logging.INFO)
+    logger.propagate = False  # root handlers would print every line again
     
     # Create formatters
     file_formatter = logging.Formatter(
@@ -26,9 +94,10 @@ def setup_logger(name='cloud_security_api'):
         '%(levelname)s: %(message)s'
     )
     
-    # File handler (rotating daily)
-    log_file = f'logs/api_{datetime.now().strftime("%Y%m%d")}.log'
-    file_handler = logging.FileHandler(log_file)
+    # File handler (rotates at 50 MB, keeps 7 old files, buffered writes)
+    file_handler = BufferedRotatingFileHandler(
+        'logs/api.log', maxBytes=50_000_000, backupCount=7
+    )
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(file_formatter)
     
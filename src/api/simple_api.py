@@ -1,5 +1,23 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
 from flask import Flask, request, jsonify
 
+# One case-insensitive scan finds every risky pattern; group N matches RISK_RULES[N-1]
+RISK_PATTERN = re.compile(r'(public)|(0\.0\.0\.0/0)|(password)', re.IGNORECASE)
+RISK_RULES = [
+    (0.4, "Public access detected"),
+    (0.3, "Open to entire internet"),
+    (0.2, "Hardcoded password found"),
+]
+
+# Results of recent submissions, keyed by content hash (CI re-submits unchanged code)
+CACHE_SIZE = 4096
+score_cache = OrderedDict()
+score_cache_lock = threading.Lock()
+cache_stats = {'hits': 0, 'misses': 0}
+
 # Create a Flask app
 app = Flask(__name__)
 
@@ -15,22 +33,69 @@ def analyze():
     data = request.json
     terraform_code = data.get('terraform_code', '')
     
+    decision, risk_score, problems = cached_score(terraform_code)
+    
+    # Return result
+    return jsonify({
+        "decision": decision,
+        "risk_score": risk_score,
+        "problems": list(problems)
+    })
+
+# Route 3: Result cache counters
+@app.route('/cache_stats')
+def get_cache_stats():
+    with score_cache_lock:
+        return jsonify({
+            **cache_stats,
+            "size": len(score_cache),
+            "max_size": CACHE_SIZE
+        })
+
+def cached_score(terraform_code):
+    """
+    Score code, reusing the result if the same code was seen recently
+    
+    Returns:
+        (decision, risk_score, problems tuple)
+    """
+    
+    key = hashlib.blake2b(terraform_code.encode('utf-8'), digest_size=16).digest()
+    
+    with score_cache_lock:
+        if key in score_cache:
+            score_cache.move_to_end(key)
+            cache_stats['hits'] += 1
+            return score_cache[key]
+        cache_stats['misses'] += 1
+    
+    result = score(terraform_code)
+    
+    with score_cache_lock:
+        score_cache[key] = result
+        if len(score_cache) > CACHE_SIZE:
+            score_cache.popitem(last=False)
+    
+    return result
+
+def score(terraform_code):
+    """Apply the risk rules to the code, returns (decision, risk_score, problems tuple)"""
+    
     # Simple risk calculation (we'll make this smarter later)
     risk_score = 0.0
     problems = []
     
-    # Check for risky patterns
-    if 'public' in terraform_code.lower():
-        risk_score += 0.4
-        problems.append("Public access detected")
+    # Check for risky patterns (each rule counts once)
+    found = set()
+    for match in RISK_PATTERN.finditer(terraform_code):
+        found.add(match.lastindex - 1)
+        if len(found) == len(RISK_RULES):
+            break
     
-    if '0.0.0.0/0' in terraform_code:
-        risk_score += 0.3
-        problems.append("Open to entire internet")
-    
-    if 'password' in terraform_code.lower():
-        risk_score += 0.2
-        problems.append("Hardcoded password found")
+    for index, (weight, problem) in enumerate(RISK_RULES):
+        if index in found:
+            risk_score += weight
+            problems.append(problem)
     
     # Make decision
     if risk_score > 0.7:
@@ -40,13 +105,9 @@ def analyze():
     else:
         decision = "ALLOW"
     
-    # Return result
-    return jsonify({
-        "decision": decision,
-        "risk_score": risk_score,
-        "problems": problems
-    })
+    return decision, risk_score, tuple(problems)
 
-# Start the server
+# Start the server (local development only - see docs/deployment_guide.md
+# for running under gunicorn)
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(port=5000, threaded=True)
\ No newline at end of file
@@ -1,6 +1,30 @@
+import re
+import pandas as pd
+
+# Compiled once, one pass over the bucket name instead of one scan per keyword
+SENSITIVE_RE = re.compile(r'customer|user|personal|data|backup|prod', re.IGNORECASE)
+
+REQUIRED_TAGS = ('Environment', 'Owner', 'Purpose')
+REQUIRED_TAG_COUNT = len(REQUIRED_TAGS)
+
+def _first_block(value):
+    """hcl2 returns nested blocks as a list of dicts, use the first one"""
+    if isinstance(value, list):
+        return value[0] if value else {}
+    return value if isinstance(value, dict) else {}
+
+def _truthy(series):
+    return series.fillna(False).map(bool)
+
+def _has_wildcard_origin(cors):
+    if not isinstance(cors, (list, dict)) or not cors:
+        return False
+    rules = cors if isinstance(cors, list) else [cors]
+    return any('*' in rule.get('allowed_origins', []) for rule in rules)
+
 def extract_security_features(resource):
     """
-    Extracts security-relevant features from a resource
+    Extract 10 security features from a resource
     
     Args:
         resource: Parsed resource dictionary
@@ -21,90 +45,79 @@ def extract_security_features(resource):
     features['encryption_enabled'] = 1 if has_encryption else 0
     
     # Feature 3: Versioning
-    versioning = properties.get('versioning', {})
-
-    # FIX list case
-    if isinstance(versioning, list) and len(versioning) > 0:
-        versioning = versioning[0]
-
+    versioning = _first_block(properties.get('versioning'))
     features['versioning_enabled'] = 1 if versioning.get('enabled') else 0
-
     
     # Feature 4: Logging
-    logging = properties.get('logging', {})
-
-    if isinstance(logging, list) and len(logging) > 0:
-        logging = logging[0]
-
+    logging = _first_block(properties.get('logging'))
     features['logging_enabled'] = 1 if logging else 0
-
     
     # Feature 5: Sensitive naming
     bucket_name = properties.get('bucket', '')
-    sensitive_keywords = ['customer', 'user', 'personal', 'data', 'backup', 'prod']
-    features['sensitive_naming'] = 1 if any(kw in bucket_name.lower() for kw in sensitive_keywords) else 0
+    features['sensitive_naming'] = 1 if SENSITIVE_RE.search(bucket_name) else 0
     
     # Feature 6: Tags present
     tags = properties.get('tags', {})
     features['has_tags'] = 1 if tags else 0
     
-def extract_security_features(resource):
-    """
-    Extract 10 security features (upgraded from 6)
-    """
-    
-    properties = resource['properties']
-    features = {}
+    # Feature 7: MFA Delete
+    features['mfa_delete_enabled'] = 1 if versioning.get('mfa_delete') else 0
     
-    # ORIGINAL 6 FEATURES
-    acl = properties.get('acl', 'private')
-    features['public_access'] = 1 if 'public' in acl else 0
-    
-    has_encryption = 'server_side_encryption_configuration' in properties
-    features['encryption_enabled'] = 1 if has_encryption else 0
-    
-    versioning = properties.get('versioning', {})
-    features['versioning_enabled'] = 1 if versioning.get('enabled') else 0
-    
-    logging = properties.get('logging', {})
-    features['logging_enabled'] = 1 if logging else 0
-    
-    bucket_name = properties.get('bucket', '')
-    sensitive_keywords = ['customer', 'user', 'personal', 'data', 'backup', 'prod']
-    features['sensitive_naming'] = 1 if any(kw in bucket_name.lower() for kw in sensitive_keywords) else 0
-    
-    tags = properties.get('tags', {})
-    features['has_tags'] = 1 if tags else 0
-    
-    # NEW FEATURE 7: MFA Delete
-    mfa_delete = versioning.get('mfa_delete', False)
-    features['mfa_delete_enabled'] = 1 if mfa_delete else 0
-    
-    # NEW FEATURE 8: Lifecycle Policy
+    # Feature 8: Lifecycle Policy
     lifecycle = properties.get('lifecycle_rule', [])
     features['has_lifecycle_policy'] = 1 if lifecycle else 0
     
-    # NEW FEATURE 9: Risky CORS
-    cors = properties.get('cors_rule', [])
-    if cors:
-        has_wildcard_cors = any(
-            '*' in rule.get('allowed_origins', []) 
-            for rule in (cors if isinstance(cors, list) else [cors])
-        )
-        features['risky_cors'] = 1 if has_wildcard_cors else 0
-    else:
-        features['risky_cors'] = 0
+    # Feature 9: Risky CORS
+    features['risky_cors'] = 1 if _has_wildcard_origin(properties.get('cors_rule')) else 0
     
-    # NEW FEATURE 10: Tag Quality
+    # Feature 10: Tag Quality
     if tags:
-        required_tags = ['Environment', 'Owner', 'Purpose']
-        tag_quality = sum(1 for tag in required_tags if tag in tags)
-        features['tag_quality'] = tag_quality / len(required_tags)
+        tag_quality = sum(1 for tag in REQUIRED_TAGS if tag in tags)
+        features['tag_quality'] = tag_quality / REQUIRED_TAG_COUNT
     else:
         features['tag_quality'] = 0.0
     
     return features
 
+def extract_security_features_batch(resources):
+    """
+    Extract the same 10 features for many resources at once
+    
+    Args:
+        resources: List of parsed resource dictionaries
+        
+    Returns:
+        DataFrame with one row per resource
+    """
+    
+    # One column per property, NaN where a resource doesn't set it
+    properties = pd.DataFrame([resource['properties'] for resource in resources])
+    
+    def column(name):
+        return properties.get(name, pd.Series(index=properties.index, dtype=object))
+    
+    versioning = column('versioning').map(_first_block)
+    tags = column('tags')
+    has_tags = _truthy(tags)
+    
+    features = pd.DataFrame(index=properties.index)
+    features['public_access'] = column('acl').fillna('private').astype(str).str.contains('public', regex=False)
+    features['encryption_enabled'] = column('server_side_encryption_configuration').notna()
+    features['versioning_enabled'] = _truthy(versioning.str.get('enabled'))
+    features['logging_enabled'] = column('logging').map(_first_block).map(bool)
+    features['sensitive_naming'] = column('bucket').fillna('').astype(str).str.contains(SENSITIVE_RE)
+    features['has_tags'] = has_tags
+    features['mfa_delete_enabled'] = _truthy(versioning.str.get('mfa_delete'))
+    features['has_lifecycle_policy'] = _truthy(column('lifecycle_rule'))
+    features['risky_cors'] = column('cors_rule').map(_has_wildcard_origin)
+    features = features.astype(int)
+    
+    # Fraction of the required tags that are present
+    tag_hits = sum(tags.str.get(tag).notna() for tag in REQUIRED_TAGS)
+    features['tag_quality'] = (tag_hits / REQUIRED_TAG_COUNT).where(has_tags, 0.0)
+    
+    return features
+
 # Test
 if __name__ == '__main__':
     from parse_terraform import parse_terraform_file
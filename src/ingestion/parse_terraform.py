@@ -1,26 +1,35 @@
+import hashlib
 import hcl2
 import json
+import os
+import pickle
 
-def parse_terraform_file(file_path):
+# Parsed files are cached on disk, keyed by path + mtime + hcl2 version
+PARSE_CACHE_DIR = os.path.join('data', 'cache', 'parse')
+HCL2_VERSION = getattr(hcl2, '__version__', 'unknown')
+PARSE_FORMAT = 2  # bump when the shape of a parse result changes
+
+def _unquote(label):
+    """python-hcl2 8.x keeps the quotes around block labels, 7.x doesn't"""
+    return label[1:-1] if len(label) >= 2 and label[0] == label[-1] == '"' else label
+
+def parse_terraform_string(terraform_code, source='<string>'):
     """
-    Reads a Terraform file and extracts information
+    Parses Terraform code that is already in memory
     
     Args:
-        file_path: Path to .tf file
+        terraform_code: Raw Terraform code as string
+        source: Name used in error messages and the result's 'file' key
         
     Returns:
         Dictionary with extracted information
     """
     
-    # Read the file
-    with open(file_path, 'r') as file:
-        terraform_code = file.read()
-    
     # Parse with HCL2 library
     try:
         parsed = hcl2.loads(terraform_code)
     except Exception as e:
-        print(f"Error parsing {file_path}: {e}")
+        print(f"Error parsing {source}: {e}")
         return None
     
     # Extract resources
@@ -32,22 +41,70 @@ def parse_terraform_file(file_path):
                 for resource_name, resource_config in resource_configs.items():
                     
                     resource_info = {
-                        'type': resource_type,
-                        'name': resource_name,
+                        'type': _unquote(resource_type),
+                        'name': _unquote(resource_name),
                         'properties': resource_config
                     }
                     
                     resources.append(resource_info)
     
     return {
-        'file': file_path,
+        'file': source,
         'resources': resources
     }
 
+def parse_terraform_file(file_path, use_cache=True):
+    """
+    Reads a Terraform file and extracts information
+    
+    Args:
+        file_path: Path to .tf file
+        use_cache: Reuse the cached parse if the file hasn't changed
+        
+    Returns:
+        Dictionary with extracted information
+    """
+    
+    if not use_cache:
+        return _read_and_parse(file_path)
+    
+    cache_path = _parse_cache_path(file_path)
+    
+    # Cache hit: skip reading and parsing entirely
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    
+    result = _read_and_parse(file_path)
+    
+    # Only successful parses are cached, a broken file is retried next time
+    if result is not None:
+        os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    
+    return result
+
+def _read_and_parse(file_path):
+    # Read the file
+    with open(file_path, 'r') as file:
+        terraform_code = file.read()
+    
+    return parse_terraform_string(terraform_code, source=file_path)
+
+def _parse_cache_path(file_path):
+    mtime = os.stat(file_path).st_mtime_ns
+    key = hashlib.sha1(f"{file_path}:{mtime}:{HCL2_VERSION}:{PARSE_FORMAT}".encode()).hexdigest()
+    return os.path.join(PARSE_CACHE_DIR, f"{key}.pkl")
+
 # Test it
 if __name__ == '__main__':
     # Parse example file
     result = parse_terraform_file('data/raw/safe/example_001.tf')
     
     # Print nicely
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    print(json.dumps(result, indent=2))
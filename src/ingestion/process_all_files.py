@@ -1,17 +1,36 @@
 import os
+import sys
 import pandas as pd
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from parse_terraform import parse_terraform_file
-from extract_features import extract_security_features
+from extract_features import extract_security_features_batch
 
-def process_all_files(data_dir='data/raw'):
+# Resources featurized and appended to the CSV at a time (caps peak memory)
+CHUNK_SIZE = 10000
+
+def _process_one_file(task):
+    """Parse one file in a worker process (top-level so it can be pickled)"""
+    file_path, use_cache = task
+    return parse_terraform_file(file_path, use_cache=use_cache)
+
+def process_all_files(data_dir='data/raw', use_cache=True):
     """
     Process all Terraform files and create dataset
+    
+    Args:
+        data_dir: Directory with safe/risky/unsure subfolders
+        use_cache: Reuse cached parses from data/cache/parse (--no-cache to disable)
+        
+    Returns:
+        Path of the written CSV
     """
     
-    all_data = []
+    output_path = 'data/processed/dataset.csv'
     
     # Get all .tf files
     categories = ['safe', 'risky', 'unsure']
+    tasks = []
     
     for category in categories:
         category_dir = os.path.join(data_dir, category)
@@ -26,51 +45,71 @@ def process_all_files(data_dir='data/raw'):
         print(f"Processing {len(files)} files from {category}...")
         
         for filename in files:
-            file_path = os.path.join(category_dir, filename)
-            
-            # Parse file
-            parsed = parse_terraform_file(file_path)
-            
+            tasks.append((os.path.join(category_dir, filename), filename, category))
+    
+    # Resources waiting to be featurized, written out every CHUNK_SIZE
+    resources = []
+    metadata = {'filename': [], 'category': [], 'resource_type': [], 'resource_name': []}
+    label_counts = Counter()
+    total = 0
+    
+    def write_chunk(first):
+        # Extract features for the whole chunk at once, then add metadata
+        df = extract_security_features_batch(resources)
+        for key, values in metadata.items():
+            df[key] = values
+        
+        # Add label (for machine learning)
+        # SAFE = 0, RISKY = 1
+        df['label'] = (df['category'] != 'safe').astype(int)
+        label_counts.update(df['label'])
+        
+        df.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+        
+        resources.clear()
+        for values in metadata.values():
+            values.clear()
+        return len(df)
+    
+    # Parse files in parallel, hcl2 is pure Python so threads wouldn't help
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        parsed_files = pool.map(
+            _process_one_file,
+            [(file_path, use_cache) for file_path, _, _ in tasks],
+            chunksize=16
+        )
+        
+        for (file_path, filename, category), parsed in zip(tasks, parsed_files):
             if not parsed or not parsed['resources']:
                 print(f"  ⚠️  Skipping {filename} - no resources found")
                 continue
             
-            # Process each resource
             for resource in parsed['resources']:
-                # Extract features
-                features = extract_security_features(resource)
-                
-                # Add metadata
-                features['filename'] = filename
-                features['category'] = category
-                features['resource_type'] = resource['type']
-                features['resource_name'] = resource['name']
-                
-                # Add label (for machine learning)
-                # SAFE = 0, RISKY = 1
-                features['label'] = 0 if category == 'safe' else 1
-                
-                all_data.append(features)
+                resources.append(resource)
+                metadata['filename'].append(filename)
+                metadata['category'].append(category)
+                metadata['resource_type'].append(resource['type'])
+                metadata['resource_name'].append(resource['name'])
             
             print(f"  ✅ Processed {filename}")
+            
+            if len(resources) >= CHUNK_SIZE:
+                total += write_chunk(first=total == 0)
     
-    # Convert to pandas DataFrame (like Excel spreadsheet)
-    df = pd.DataFrame(all_data)
-    
-    # Save to CSV
-    output_path = 'data/processed/dataset.csv'
-    df.to_csv(output_path, index=False)
+    # Last partial chunk (also writes the header if nothing was written yet)
+    if resources or total == 0:
+        total += write_chunk(first=total == 0)
     
     print(f"\n✅ Dataset created: {output_path}")
-    print(f"   Total examples: {len(df)}")
-    print(f"   Safe: {len(df[df['label']==0])}")
-    print(f"   Risky: {len(df[df['label']==1])}")
+    print(f"   Total examples: {total}")
+    print(f"   Safe: {label_counts[0]}")
+    print(f"   Risky: {label_counts[1]}")
     
-    return df
+    return output_path
 
 if __name__ == '__main__':
-    dataset = process_all_files()
+    output_path = process_all_files(use_cache='--no-cache' not in sys.argv)
     
     # Show first few rows
     print("\nFirst 5 examples:")
-    print(dataset.head())
\ No newline at end of file
+    print(pd.read_csv(output_path, nrows=5))
\ No newline at end of file
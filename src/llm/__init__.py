@@ -6,17 +6,50 @@ Automatically detects which provider is available
 
 import os
 import json
+import threading
 from dotenv import load_dotenv
 
+# orjson is much faster for request/response bodies; fall back to json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(obj):
+    return orjson.dumps(obj) if orjson else json.dumps(obj)
+
+def _loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
 # Load environment variables
 load_dotenv()
 
+# Keep-alive connections kept per client, so calls reuse TCP + TLS sessions
+MAX_POOL_CONNECTIONS = 50
+
+# Small model is enough for the short structured answers; LLM_MODEL overrides
+DEFAULT_OPENAI_MODEL = 'gpt-4o-mini'
+
+# Bedrock error codes meaning these credentials can't use the model at all
+# (as opposed to throttling or a bad request); before any Bedrock call has
+# worked, these switch the wrapper to OpenAI
+BEDROCK_ACCESS_ERRORS = {
+    'AccessDeniedException',
+    'UnrecognizedClientException',
+    'ResourceNotFoundException',
+}
+
+def _is_bedrock_access_error(error):
+    """True if the botocore error behind error is a BEDROCK_ACCESS_ERRORS code"""
+    response = getattr(error.__cause__, 'response', None) or {}
+    return response.get('Error', {}).get('Code') in BEDROCK_ACCESS_ERRORS
+
 class LLMWrapper:
     """
     Unified interface for LLM calls
     Automatically uses best available provider:
     1. AWS Bedrock (Claude 3) - preferred for production
-    2. OpenAI (GPT-3.5) - fallback for development
+    2. OpenAI (gpt-4o-mini, or LLM_MODEL) - fallback for development
     """
     
     def __init__(self, verbose=False):
@@ -31,6 +64,11 @@ class LLMWrapper:
         self.client = None
         self.model_id = None
         
+        # Bedrock is chosen without a test call, so the first real call
+        # decides whether its model access works
+        self._bedrock_verified = False
+        self._switch_lock = threading.Lock()
+        
         # Try to initialize provider
         self._initialize_provider()
     
@@ -51,7 +89,7 @@ class LLMWrapper:
         if self._try_openai():
             self.provider = 'openai'
             if self.verbose:
-                print("✅ Using OpenAI (GPT-3.5 Turbo)")
+                print(f"✅ Using OpenAI ({self.model_id})")
             return
         
         # No provider available
@@ -72,13 +110,19 @@ class LLMWrapper:
                 return False
             
             import boto3
+            from botocore.config import Config
             
-            # Create Bedrock runtime client
+            # Create Bedrock runtime client (pooled keep-alive connections)
             self.client = boto3.client(
                 'bedrock-runtime',
                 region_name=os.getenv('AWS_REGION', 'us-east-1'),
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                config=Config(
+                    max_pool_connections=MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                    retries={'max_attempts': 3, 'mode': 'adaptive'}
+                )
             )
             
             # Set model ID
@@ -87,17 +131,9 @@ class LLMWrapper:
                 'anthropic.claude-3-sonnet-20240229-v1:0'
             )
             
-            # Test with a simple call
-            test_body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 10,
-                "messages": [{"role": "user", "content": "Hello"}]
-            })
-            
-            self.client.invoke_model(
-                modelId=self.model_id,
-                body=test_body
-            )
+            # No test inference here: it costs a paid call on every start.
+            # Bad credentials or missing model access surface on the first
+            # generate(), which then falls back to OpenAI.
             
             return True
         
@@ -119,15 +155,30 @@ class LLMWrapper:
             
             from openai import OpenAI
             
-            self.client = OpenAI(api_key=api_key)
-            self.model_id = "gpt-3.5-turbo"
+            # One pooled HTTP client for all calls; HTTP/2 (needs the h2
+            # package) lets concurrent calls share one connection
+            try:
+                import httpx
+                try:
+                    import h2
+                    http2 = True
+                except ImportError:
+                    http2 = False
+                http_client = httpx.Client(
+                    http2=http2,
+                    limits=httpx.Limits(
+                        max_connections=MAX_POOL_CONNECTIONS,
+                        max_keepalive_connections=32
+                    ),
+                    timeout=60.0
+                )
+            except ImportError:
+                http_client = None  # OpenAI builds its own default client
             
-            # Test with a simple call
-            self.client.chat.completions.create(
-                model=self.model_id,
-                messages=[{"role": "user", "content": "Hello"}],
-                max_tokens=10
-            )
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
+            self.model_id = os.getenv('LLM_MODEL', DEFAULT_OPENAI_MODEL)
+            
+            # Key is checked by the first generate() call, not a test request
             
             return True
         
@@ -136,7 +187,7 @@ class LLMWrapper:
                 print(f"⏭️  Skipping OpenAI: {str(e)[:50]}...")
             return False
     
-    def generate(self, prompt, max_tokens=500, temperature=0.1):
+    def generate(self, prompt, max_tokens=500, temperature=0.1, system=None, stop=None):
         """
         Generate text using available LLM
         
@@ -144,43 +195,62 @@ class LLMWrapper:
             prompt: Input text prompt
             max_tokens: Maximum length of response
             temperature: Creativity (0.0 = deterministic, 1.0 = creative)
+            system: System prompt; keep it identical across calls so provider
+                prompt caching can reuse it (default: generic expert persona)
+            stop: List of strings that end the response early (not included)
         
         Returns:
             Generated text string
         """
         
         if self.provider == 'bedrock':
-            return self._generate_bedrock(prompt, max_tokens, temperature)
+            try:
+                text = self._generate_bedrock(prompt, max_tokens, temperature, system, stop)
+            except Exception as e:
+                if not self._fall_back_to_openai(e):
+                    raise
+                return self._generate_openai(prompt, max_tokens, temperature, system, stop)
+            self._bedrock_verified = True
+            return text
         elif self.provider == 'openai':
-            return self._generate_openai(prompt, max_tokens, temperature)
+            return self._generate_openai(prompt, max_tokens, temperature, system, stop)
         else:
             raise ValueError("No LLM provider initialized")
     
-    def _generate_bedrock(self, prompt, max_tokens, temperature):
+    def _fall_back_to_openai(self, error):
+        """
+        Switch to OpenAI after a Bedrock access error on the first call
+        
+        Returns:
+            True if OpenAI is now the provider, False to re-raise error
+        """
+        
+        if self._bedrock_verified or not _is_bedrock_access_error(error):
+            return False
+        
+        with self._switch_lock:
+            # Another thread may have switched already
+            if self.provider != 'openai':
+                if not self._try_openai():
+                    return False
+                self.provider = 'openai'
+                if self.verbose:
+                    print(f"⚠️  Bedrock unavailable ({str(error)[:50]}...), using OpenAI ({self.model_id})")
+        
+        return True
+    
+    def _generate_bedrock(self, prompt, max_tokens, temperature, system=None, stop=None):
         """Generate using AWS Bedrock (Claude)"""
         
         try:
-            # Prepare request body
-            body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            })
-            
             # Call Bedrock
             response = self.client.invoke_model(
                 modelId=self.model_id,
-                body=body
+                body=self._bedrock_body(prompt, max_tokens, temperature, system, stop)
             )
             
             # Parse response
-            response_body = json.loads(response['body'].read())
+            response_body = _loads(response['body'].read())
             
             # Extract text
             text = response_body['content'][0]['text']
@@ -188,32 +258,142 @@ class LLMWrapper:
             return text
         
         except Exception as e:
-            raise Exception(f"Bedrock API error: {str(e)}")
+            raise Exception(f"Bedrock API error: {str(e)}") from e
     
-    def _generate_openai(self, prompt, max_tokens, temperature):
+    def _generate_openai(self, prompt, max_tokens, temperature, system=None, stop=None):
         """Generate using OpenAI (GPT)"""
         
         try:
             response = self.client.chat.completions.create(
                 model=self.model_id,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful cloud security expert."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=self._openai_messages(prompt, system),
                 max_tokens=max_tokens,
-                temperature=temperature
+                temperature=temperature,
+                **self._openai_stop(stop)
             )
             
             return response.choices[0].message.content
         
         except Exception as e:
-            raise Exception(f"OpenAI API error: {str(e)}")
+            raise Exception(f"OpenAI API error: {str(e)}") from e
+    
+    def generate_stream(self, prompt, max_tokens=500, temperature=0.1, system=None, stop=None):
+        """
+        Like generate(), but yields text pieces as the model produces them
+        
+        Closing the generator early stops reading the response.
+        """
+        
+        if self.provider == 'bedrock':
+            return self._stream_bedrock_with_fallback(prompt, max_tokens, temperature, system, stop)
+        elif self.provider == 'openai':
+            return self._stream_openai(prompt, max_tokens, temperature, system, stop)
+        else:
+            raise ValueError("No LLM provider initialized")
+    
+    def _stream_bedrock_with_fallback(self, prompt, max_tokens, temperature, system=None, stop=None):
+        """_stream_bedrock, switching to OpenAI if the first call is refused"""
+        
+        stream = self._stream_bedrock(prompt, max_tokens, temperature, system, stop)
+        try:
+            # Bedrock errors surface on the first read, before any text
+            try:
+                first = next(stream, None)
+            except Exception as e:
+                if not self._fall_back_to_openai(e):
+                    raise
+                yield from self._stream_openai(prompt, max_tokens, temperature, system, stop)
+                return
+            
+            self._bedrock_verified = True
+            if first is not None:
+                yield first
+                yield from stream
+        finally:
+            stream.close()
+    
+    def _stream_bedrock(self, prompt, max_tokens, temperature, system=None, stop=None):
+        """Stream using AWS Bedrock (Claude)"""
+        
+        try:
+            response = self.client.invoke_model_with_response_stream(
+                modelId=self.model_id,
+                body=self._bedrock_body(prompt, max_tokens, temperature, system, stop)
+            )
+            
+            # Close the event stream too if the caller stops early
+            try:
+                for event in response['body']:
+                    if 'chunk' not in event:
+                        continue
+                    chunk = _loads(event['chunk']['bytes'])
+                    if chunk.get('type') == 'content_block_delta':
+                        yield chunk['delta'].get('text', '')
+            finally:
+                response['body'].close()
+        
+        except Exception as e:
+            raise Exception(f"Bedrock API error: {str(e)}") from e
+    
+    def _stream_openai(self, prompt, max_tokens, temperature, system=None, stop=None):
+        """Stream using OpenAI (GPT)"""
+        
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model_id,
+                messages=self._openai_messages(prompt, system),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                **self._openai_stop(stop)
+            )
+            
+            try:
+                for chunk in stream:
+                    if chunk.choices:
+                        yield chunk.choices[0].delta.content or ''
+            finally:
+                stream.close()
+        
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}") from e
+    
+    def _bedrock_body(self, prompt, max_tokens, temperature, system=None, stop=None):
+        """Request body (bytes from orjson, str from json - boto3 takes both)"""
+        
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+        if system:
+            body["system"] = system
+        if stop:
+            body["stop_sequences"] = list(stop)
+        
+        return _dumps(body)
+    
+    def _openai_stop(self, stop):
+        """Only send stop when set, the API rejects an empty list"""
+        return {'stop': list(stop)} if stop else {}
+    
+    def _openai_messages(self, prompt, system=None):
+        return [
+            {
+                "role": "system",
+                "content": system or "You are a helpful cloud security expert."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
     
     def get_provider_info(self):
         """Get information about current provider"""
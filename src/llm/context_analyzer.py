@@ -2,21 +2,151 @@
 Context Analyzer - Uses LLM to understand infrastructure intent
 """
 
+import asyncio
+import functools
+import re
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from llm.llm_wrapper import LLMWrapper
+from llm import LLMWrapper
+from utils.cache import llm_cache
+
+# Start of one resource's answer in a batched response ("RESOURCE 2:", maybe in markdown)
+RESOURCE_HEADER = re.compile(r'^[\s*#]*RESOURCE\s+(\d+)\s*:?.*$', re.IGNORECASE | re.MULTILINE)
+
+# "FIELD: value" lines of an answer, found in one pass over the response
+FIELD_PATTERN = re.compile(
+    r'^[^\S\n]*(INTENT|PURPOSE|RISK_SCORE|CONCERNS|REASONING):(.*)$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+REASONING_LINE = re.compile(r'^[^\S\n]*REASONING:', re.IGNORECASE)
+
+ANSWER_FORMAT = """INTENT: [intentional/accidental]
+PURPOSE: [description]
+RISK_SCORE: [0.0-1.0]
+CONCERNS: [concern1] | [concern2]
+REASONING: [explanation]"""
+
+QUESTIONS = """1. INTENT: intentional or accidental?
+2. PURPOSE: What's this for? (1 sentence)
+3. RISK_SCORE: 0.0 (safe) to 1.0 (dangerous)
+4. CONCERNS: List issues (or "None")
+5. REASONING: Why this risk score?"""
+
+# Instructions are the same for every call, so they go first as the system
+# prompt; providers with prompt caching can then reuse that prefix
+SYSTEM_PROMPT = """You are a cloud security expert. Analyze the Terraform configuration in the user message.
+
+Determine:
+""" + QUESTIONS + """
+
+Format:
+""" + ANSWER_FORMAT + """
+END"""
+
+BATCH_SYSTEM_PROMPT = """You are a cloud security expert. The user message contains several numbered Terraform configurations. Analyze each one independently.
+
+For EACH resource determine:
+""" + QUESTIONS + """
+
+Answer every resource in order, starting each answer with its "RESOURCE <number>:" line:
+RESOURCE 1:
+""" + ANSWER_FORMAT + """
+RESOURCE 2:
+...
+After the last resource write a line containing only END."""
+
+# The model stops decoding at the END line instead of adding prose after the
+# answer (stop sequences aren't included in the returned text)
+STOP_SEQUENCES = ["\nEND"]
+
+# The per-resource part only varies in these fields, so it is a format string.
+# Kept compact (one line of yes/no flags, no emoji): prompt tokens cost prefill
+FEATURES_TEMPLATE = "public={public} encryption={encryption} sensitive_name={sensitive}"
+
+# Only 2**3 feature lines exist, so build them all once; Feats.index picks one
+FEATURES_LINES = tuple(
+    FEATURES_TEMPLATE.format(
+        public=('no', 'yes')[i & 1],
+        encryption=('no', 'yes')[(i >> 1) & 1],
+        sensitive=('no', 'yes')[(i >> 2) & 1]
+    )
+    for i in range(8)
+)
+
+PROMPT_TEMPLATE = """RESOURCE: {name}
+FEATURES: {features}
+CODE:
+```
+{code}
+```
+"""
+
+MAX_TOKENS = 180     # answer budget per resource (a full answer is ~80 tokens)
+TEMPERATURE = 0.1
+
+# Reasoning of the placeholder for a resource the batched answer skipped
+NO_ANSWER = 'No answer for this resource in batch response'
+
+# ML scores outside this band are clear enough to answer without the LLM
+LOW_RISK_CUTOFF = 0.2
+HIGH_RISK_CUTOFF = 0.8
+
+@dataclass(frozen=True, slots=True)
+class Feats:
+    """The feature flags the analyzer reads, normalized once per resource"""
+    public_access: bool
+    encryption_enabled: bool
+    sensitive_naming: bool
+    
+    @classmethod
+    def from_features(cls, features):
+        """Build from an extract_security_features dict (extra keys ignored)"""
+        return cls(
+            bool(features.get('public_access')),
+            bool(features.get('encryption_enabled')),
+            bool(features.get('sensitive_naming'))
+        )
+    
+    @property
+    def index(self):
+        """Position of this combination in FEATURES_LINES"""
+        return self.public_access | self.encryption_enabled << 1 | self.sensitive_naming << 2
+
+@functools.lru_cache(maxsize=1)
+def _shared_llm_wrapper(verbose):
+    """One LLMWrapper per process, so analyzers share its client and connection pool"""
+    return LLMWrapper(verbose=verbose)
 
 class ContextAnalyzer:
-    def __init__(self, verbose=False):
-        self.llm = LLMWrapper(verbose=verbose)
+    def __init__(self, verbose=False, use_cache=True):
+        self.llm = _shared_llm_wrapper(verbose)
         self.verbose = verbose
+        
+        # Parsed answers persist across runs, keyed by model, prompt and
+        # generation settings
+        self.cache = llm_cache if use_cache else None
+        
+        # analyze() calls answered by the ML gate instead of the LLM
+        self.calls = 0
+        self.llm_skips = 0
+    
+    @property
+    def llm_skip_rate(self):
+        return self.llm_skips / self.calls if self.calls else 0.0
     
-    def analyze(self, terraform_code, resource_name, features):
+    def analyze(self, terraform_code, resource_name, features, bypass_cache=False, ml_risk_score=None):
         """
         Analyze infrastructure code for security context
         
+        Args:
+            bypass_cache: Always call the LLM (the fresh answer is still cached)
+            ml_risk_score: ML model score; clear-cut scores skip the LLM call
+        
         Returns:
         {
             'intent': 'intentional' or 'accidental',
@@ -27,52 +157,187 @@ class ContextAnalyzer:
         }
         """
         
-        prompt = self._create_prompt(terraform_code, resource_name, features)
+        self.calls += 1
+        feats = Feats.from_features(features)
+        gated = self._gate(ml_risk_score, feats)
+        if gated is not None:
+            self.llm_skips += 1
+            return gated
+        
+        prompt = self._create_prompt(terraform_code, resource_name, feats)
+        
+        key = self._cache_key(SYSTEM_PROMPT, prompt, MAX_TOKENS)
+        cached = None if bypass_cache else self._cache_get(key)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.llm.generate(prompt, max_tokens=600)
-            return self._parse_response(response)
+            response = self._generate_until_reasoning(prompt, max_tokens=MAX_TOKENS)
+            result = self._parse_response(response)
+            self._cache_set(key, result)
+            return result
         except Exception as e:
+            return self._failed_result(f'Error: {e}')
+    
+    async def analyze_async(self, terraform_code, resource_name, features, bypass_cache=False,
+                            ml_risk_score=None):
+        """
+        analyze() for asyncio callers
+        
+        The LLM call runs in a worker thread, so several analyses started
+        together with asyncio.gather wait on the network at the same time.
+        """
+        return await asyncio.to_thread(
+            self.analyze, terraform_code, resource_name, features, bypass_cache, ml_risk_score
+        )
+    
+    def analyze_batch(self, items, batch_size=8, bypass_cache=False):
+        """
+        Analyze many resources, packing batch_size of them into each LLM call
+        
+        Args:
+            items: List of (terraform_code, resource_name, features) tuples
+            batch_size: Resources per prompt
+            bypass_cache: Always call the LLM (fresh answers are still cached)
+            
+        Returns:
+            List of analyze() style results, in input order
+        """
+        
+        chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        if not chunks:
+            return []
+        
+        # Each chunk is still one network round-trip, so overlap them
+        with ThreadPoolExecutor(max_workers=min(len(chunks), 4)) as executor:
+            chunk_results = list(executor.map(
+                lambda chunk: self._analyze_chunk(chunk, bypass_cache), chunks
+            ))
+        
+        return [result for chunk in chunk_results for result in chunk]
+    
+    def _generate_until_reasoning(self, prompt, max_tokens):
+        """
+        Stream the answer and stop reading once the REASONING line is complete
+        
+        REASONING is the last field of the answer format, anything after it
+        is discarded by _parse_response anyway.
+        """
+        
+        parts = []
+        line = ''
+        stream = self.llm.generate_stream(
+            prompt, max_tokens=max_tokens, temperature=TEMPERATURE,
+            system=SYSTEM_PROMPT, stop=STOP_SEQUENCES
+        )
+        
+        try:
+            for piece in stream:
+                parts.append(piece)
+                line += piece
+                if '\n' not in piece:
+                    continue
+                
+                *complete_lines, line = line.split('\n')
+                if any(REASONING_LINE.match(l) for l in complete_lines):
+                    break
+        finally:
+            stream.close()
+        
+        return ''.join(parts)
+    
+    def _analyze_chunk(self, chunk, bypass_cache=False):
+        if len(chunk) == 1:
+            return [self.analyze(*chunk[0], bypass_cache=bypass_cache)]
+        
+        prompt = self._create_batch_prompt(chunk)
+        max_tokens = MAX_TOKENS * len(chunk)
+        
+        key = self._cache_key(BATCH_SYSTEM_PROMPT, prompt, max_tokens)
+        cached = None if bypass_cache else self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = self.llm.generate(
+                prompt, max_tokens=max_tokens, temperature=TEMPERATURE,
+                system=BATCH_SYSTEM_PROMPT, stop=STOP_SEQUENCES
+            )
+            results = self._parse_response_batch(response, len(chunk))
+            # A truncated answer must not be replayed from the cache forever
+            if all(r['reasoning'] != NO_ANSWER for r in results):
+                self._cache_set(key, results)
+            return results
+        except Exception as e:
+            return [self._failed_result(f'Error: {e}') for _ in chunk]
+    
+    def _cache_key(self, system, prompt, max_tokens):
+        """Everything that changes the answer: model, prompts and generation settings"""
+        return "\x00".join((str(self.llm.model_id), system, prompt, str(TEMPERATURE), str(max_tokens)))
+    
+    def _cache_get(self, key):
+        if self.cache is None:
+            return None
+        return self.cache.get(key)
+    
+    def _cache_set(self, key, value):
+        if self.cache is not None:
+            self.cache.set(key, value)
+    
+    def _gate(self, ml_risk_score, feats):
+        """Fixed answer when the ML score alone settles it, else None"""
+        
+        if ml_risk_score is None:
+            return None
+        
+        # A public resource is exactly what the intent question is for
+        if ml_risk_score < LOW_RISK_CUTOFF and not feats.public_access:
             return {
-                'intent': 'unknown',
-                'purpose': 'Analysis failed',
-                'llm_risk_score': 0.5,
-                'reasoning': f'Error: {e}',
+                'intent': 'intentional',
+                'purpose': 'Low-risk configuration',
+                'llm_risk_score': ml_risk_score,
+                'reasoning': f'ML risk score {ml_risk_score:.2f} is clearly low, LLM not consulted',
                 'concerns': []
             }
-    
-    def _create_prompt(self, code, name, features):
-        features_text = f"""- Public: {"Yes ⚠️" if features.get('public_access') else "No ✓"}
-- Encryption: {"Yes ✓" if features.get('encryption_enabled') else "No ⚠️"}
-- Sensitive Name: {"Yes ⚠️" if features.get('sensitive_naming') else "No ✓"}"""
         
-        return f"""Analyze this Terraform configuration:
-
+        if ml_risk_score > HIGH_RISK_CUTOFF and feats.sensitive_naming:
+            return {
+                'intent': 'accidental',
+                'purpose': 'Sensitive data store',
+                'llm_risk_score': ml_risk_score,
+                'reasoning': f'ML risk score {ml_risk_score:.2f} is clearly high on a sensitive resource, LLM not consulted',
+                'concerns': ['High ML risk score', 'Sensitive naming pattern']
+            }
+        
+        return None
+    
+    def _failed_result(self, reasoning):
+        return {
+            'intent': 'unknown',
+            'purpose': 'Analysis failed',
+            'llm_risk_score': 0.5,
+            'reasoning': reasoning,
+            'concerns': []
+        }
+    
+    def _create_prompt(self, code, name, feats):
+        return PROMPT_TEMPLATE.format(code=code, name=name, features=FEATURES_LINES[feats.index])
+    
+    def _create_batch_prompt(self, chunk):
+        sections = []
+        for number, (code, name, features) in enumerate(chunk, 1):
+            sections.append(f"""RESOURCE {number}: {name}
+FEATURES: {FEATURES_LINES[Feats.from_features(features).index]}
 CODE:
 ```
 {code}
-```
-
-RESOURCE: {name}
-
-FEATURES:
-{features_text}
-
-Determine:
-1. INTENT: intentional or accidental?
-2. PURPOSE: What's this for? (1 sentence)
-3. RISK_SCORE: 0.0 (safe) to 1.0 (dangerous)
-4. CONCERNS: List issues (or "None")
-5. REASONING: Why this risk score?
-
-Format:
-INTENT: [intentional/accidental]
-PURPOSE: [description]
-RISK_SCORE: [0.0-1.0]
-CONCERNS: [concern1] | [concern2]
-REASONING: [explanation]"""
+```""")
+        
+        return "\n\n".join(sections)
     
     def _parse_response(self, text):
+        """Missing fields keep their defaults, so an answer cut off by max_tokens still parses"""
+        
         result = {
             'intent': 'unknown',
             'purpose': '',
@@ -81,32 +346,46 @@ REASONING: [explanation]"""
             'reasoning': text
         }
         
-        for line in text.split('\n'):
-            line = line.strip()
+        for match in FIELD_PATTERN.finditer(text):
+            field = match.group(1).upper()
+            value = match.group(2).strip()
             
-            if line.upper().startswith('INTENT:'):
-                intent = line.split(':', 1)[1].strip().lower()
-                result['intent'] = 'intentional' if 'intentional' in intent else 'accidental'
+            if field == 'INTENT':
+                result['intent'] = 'intentional' if 'intentional' in value.lower() else 'accidental'
             
-            elif line.upper().startswith('PURPOSE:'):
-                result['purpose'] = line.split(':', 1)[1].strip()
+            elif field == 'PURPOSE':
+                result['purpose'] = value
             
-            elif line.upper().startswith('RISK_SCORE:'):
+            elif field == 'RISK_SCORE':
                 try:
-                    score = float(line.split(':', 1)[1].strip())
+                    score = float(value)
                     result['llm_risk_score'] = max(0.0, min(1.0, score))
-                except:
+                except ValueError:
                     pass
             
-            elif line.upper().startswith('CONCERNS:'):
-                concerns = line.split(':', 1)[1].strip()
-                if concerns.lower() != 'none':
-                    result['concerns'] = [c.strip() for c in concerns.split('|')]
+            elif field == 'CONCERNS':
+                if value.lower() != 'none':
+                    result['concerns'] = [c.strip() for c in value.split('|')]
             
-            elif line.upper().startswith('REASONING:'):
-                result['reasoning'] = line.split(':', 1)[1].strip()
+            elif field == 'REASONING':
+                result['reasoning'] = value
         
         return result
+    
+    def _parse_response_batch(self, text, count):
+        """Split a batched response on its RESOURCE headers and parse each answer"""
+        
+        answers = {}
+        headers = list(RESOURCE_HEADER.finditer(text))
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            end = next_header.start() if next_header else len(text)
+            answers[int(header.group(1))] = text[header.end():end]
+        
+        return [
+            self._parse_response(answers[number]) if number in answers
+            else self._failed_result(NO_ANSWER)
+            for number in range(1, count + 1)
+        ]
 
 # Test
 if __name__ == '__main__':
@@ -129,9 +408,29 @@ resource "aws_s3_bucket" "website" {
         'sensitive_naming': 0
     }
     
-    result = analyzer.analyze(test_code, "website", features)
+    private_code = '''
+resource "aws_s3_bucket" "customer_data" {
+  bucket = "company-customer-data"
+  acl    = "private"
+}
+'''
+    
+    private_features = {
+        'public_access': 0,
+        'encryption_enabled': 0,
+        'sensitive_naming': 1
+    }
+    
+    # Both LLM calls are in flight at the same time
+    async def run_tests():
+        return await asyncio.gather(
+            analyzer.analyze_async(test_code, "website", features),
+            analyzer.analyze_async(private_code, "customer_data", private_features)
+        )
     
-    print(f"\nIntent: {result['intent']}")
-    print(f"Purpose: {result['purpose']}")
-    print(f"LLM Risk: {result['llm_risk_score']}")
-    print(f"Reasoning: {result['reasoning']}")
\ No newline at end of file
+    for name, result in zip(["website", "customer_data"], asyncio.run(run_tests())):
+        print(f"\n[{name}]")
+        print(f"Intent: {result['intent']}")
+        print(f"Purpose: {result['purpose']}")
+        print(f"LLM Risk: {result['llm_risk_score']}")
+        print(f"Reasoning: {result['reasoning']}")
@@ -1 +1,218 @@
+"""
+LLM Analyzer - Intent and risk analysis for the hybrid analyzer
+Falls back to a rule-based estimate when no LLM provider is configured
+"""
 
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm import LLMWrapper
+from llm.context_analyzer import LOW_RISK_CUTOFF, HIGH_RISK_CUTOFF
+
+# Same for every call, so it goes first as the system prompt (prefix caching)
+SYSTEM_PROMPT = """You are a cloud security expert. Analyze the Terraform configuration in the user message.
+
+Reply with one JSON object and nothing else:
+{"intent": "INTENTIONAL" or "ACCIDENTAL" or "UNCERTAIN",
+ "risk_score": 0.0 (safe) to 1.0 (dangerous),
+ "reasoning": "one or two sentences",
+ "concerns": ["concern1", ...],
+ "blast_radius": "low" or "medium" or "high",
+ "recommendation": "one sentence"}"""
+
+PROMPT_TEMPLATE = """RESOURCE: {name}
+FEATURES: public={public} encryption={encryption} sensitive_name={sensitive}
+CODE:
+```
+{code}
+```
+"""
+
+INTENTS = ('INTENTIONAL', 'ACCIDENTAL', 'UNCERTAIN')
+
+MAX_TOKENS = 180
+TEMPERATURE = 0.1
+
+# Decodes the JSON object in place, ignoring any prose or fences around it
+_decoder = json.JSONDecoder()
+
+class LLMAnalyzer:
+    """Asks the LLM whether a configuration's risk is intentional"""
+    
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        
+        # No provider configured: every call uses the rule-based fallback
+        try:
+            self.llm = LLMWrapper(verbose=verbose)
+            self.enabled = True
+        except ValueError as e:
+            if verbose:
+                print(f"⚠️  LLM disabled, using rule-based fallback: {e}")
+            self.llm = None
+            self.enabled = False
+    
+    def analyze_intent(self, terraform_code, resource_name, features, ml_risk_score=None):
+        """
+        Analyze the intent behind a resource configuration
+        
+        Args:
+            terraform_code: Terraform source of the resource
+            resource_name: Resource name
+            features: Feature dictionary from extract_security_features
+            ml_risk_score: Opt-in ML model score; clear-cut scores skip the
+                LLM call. Leave unset to always ask the LLM.
+        
+        Returns:
+        {
+            'intent': 'INTENTIONAL', 'ACCIDENTAL' or 'UNCERTAIN',
+            'llm_risk_score': 0.0-1.0,
+            'reasoning': 'explanation',
+            'concerns': ['concern1', ...],
+            'blast_radius': 'low', 'medium' or 'high',
+            'recommendation': 'what to change'
+        }
+        """
+        
+        gated = self._gate(ml_risk_score, features)
+        if gated is not None:
+            return gated
+        
+        if not self.enabled:
+            return self._get_fallback_analysis(features)
+        
+        prompt = PROMPT_TEMPLATE.format(
+            name=resource_name,
+            code=terraform_code,
+            public=_yes_no(features.get('public_access')),
+            encryption=_yes_no(features.get('encryption_enabled')),
+            sensitive=_yes_no(features.get('sensitive_naming'))
+        )
+        
+        try:
+            response = self.llm.generate(
+                prompt, max_tokens=MAX_TOKENS, temperature=TEMPERATURE, system=SYSTEM_PROMPT
+            )
+        except Exception as e:
+            result = self._get_fallback_analysis(features)
+            result['reasoning'] = f"LLM error, rule-based estimate: {e}"
+            return result
+        
+        return self._parse_llm_response(response, features)
+    
+    def _gate(self, ml_risk_score, features):
+        """Fixed answer when the ML score alone settles it, else None"""
+        
+        if ml_risk_score is None:
+            return None
+        
+        # A public resource is exactly what the intent question is for
+        if ml_risk_score < LOW_RISK_CUTOFF and not features.get('public_access'):
+            return {
+                'intent': 'INTENTIONAL',
+                'llm_risk_score': ml_risk_score,
+                'reasoning': f'ML risk score {ml_risk_score:.2f} is clearly low, LLM not consulted',
+                'concerns': [],
+                'blast_radius': 'low',
+                'recommendation': 'No changes needed'
+            }
+        
+        if ml_risk_score > HIGH_RISK_CUTOFF and features.get('sensitive_naming'):
+            return {
+                'intent': 'ACCIDENTAL',
+                'llm_risk_score': ml_risk_score,
+                'reasoning': f'ML risk score {ml_risk_score:.2f} is clearly high on a sensitive resource, LLM not consulted',
+                'concerns': ['High ML risk score', 'Sensitive naming pattern'],
+                'blast_radius': 'high',
+                'recommendation': 'Review the flagged settings'
+            }
+        
+        return None
+    
+    def _parse_llm_response(self, text, features):
+        """Decode the first JSON object in the response in one forward pass"""
+        
+        start = text.find('{')
+        if start == -1:
+            return self._get_fallback_analysis(features)
+        
+        try:
+            data, _ = _decoder.raw_decode(text, start)
+        except ValueError:
+            return self._get_fallback_analysis(features)
+        
+        if not isinstance(data, dict):
+            return self._get_fallback_analysis(features)
+        
+        intent = str(data.get('intent', '')).upper()
+        try:
+            score = max(0.0, min(1.0, float(data.get('risk_score', 0.5))))
+        except (TypeError, ValueError):
+            score = 0.5
+        
+        concerns = data.get('concerns') or []
+        if isinstance(concerns, str):
+            concerns = [concerns]
+        
+        return {
+            'intent': intent if intent in INTENTS else 'UNCERTAIN',
+            'llm_risk_score': score,
+            'reasoning': str(data.get('reasoning', '')),
+            'concerns': [str(c) for c in concerns],
+            'blast_radius': str(data.get('blast_radius', 'medium')).lower(),
+            'recommendation': str(data.get('recommendation', ''))
+        }
+    
+    def _get_fallback_analysis(self, features):
+        """Rule-based estimate from the feature flags alone"""
+        
+        public = 1 if features.get('public_access') else 0
+        encrypted = 1 if features.get('encryption_enabled') else 0
+        sensitive = 1 if features.get('sensitive_naming') else 0
+        score = 0.4 * public + 0.3 * (1 - encrypted) + 0.2 * sensitive
+        
+        concerns = []
+        if features.get('public_access'):
+            concerns.append('Public access enabled')
+        if not features.get('encryption_enabled'):
+            concerns.append('No encryption')
+        if features.get('sensitive_naming'):
+            concerns.append('Sensitive naming pattern')
+        
+        return {
+            'intent': 'UNCERTAIN',
+            'llm_risk_score': score,
+            'reasoning': 'Rule-based estimate (LLM unavailable)',
+            'concerns': concerns,
+            'blast_radius': 'high' if score > 0.7 else 'medium' if score > 0.3 else 'low',
+            'recommendation': 'Review the flagged settings' if concerns else 'No changes needed'
+        }
+
+def _yes_no(value):
+    return 'yes' if value else 'no'
+
+# Test
+if __name__ == '__main__':
+    analyzer = LLMAnalyzer(verbose=True)
+    
+    test_code = '''
+resource "aws_s3_bucket" "data" {
+  bucket = "customer-data"
+  acl    = "public-read"
+}
+'''
+    
+    features = {
+        'public_access': 1,
+        'encryption_enabled': 0,
+        'sensitive_naming': 1
+    }
+    
+    result = analyzer.analyze_intent(test_code, "data", features)
+    
+    print(f"Intent: {result['intent']}")
+    print(f"LLM Risk: {result['llm_risk_score']}")
+    print(f"Reasoning: {result['reasoning']}")
+    print(f"Concerns: {result['concerns']}")
@@ -17,6 +17,7 @@ class LLMConfig:
             self.api_key = os.getenv('OPENAI_API_KEY')
             if not self.api_key:
                 raise ValueError("OPENAI_API_KEY not found in .env file")
+            self.model = os.getenv('LLM_MODEL', 'gpt-4o-mini')
         
         elif self.provider == 'bedrock':
             self.region = os.getenv('AWS_REGION', 'us-east-1')
@@ -27,7 +28,7 @@ class LLMConfig:
         if self.provider == 'openai':
             return {
                 'provider': 'openai',
-                'model': 'gpt-3.5-turbo',
+                'model': self.model,
                 'api_key': self.api_key
             }
         else:
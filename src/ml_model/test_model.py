@@ -1,5 +1,36 @@
+import functools
 import joblib
-import pandas as pd
+import numpy as np
+
+MODEL_PATH = 'models/random_forest_v1.pkl'
+
+# Column order the model was trained with
+FEATURE_COLUMNS = [
+    'public_access',
+    'encryption_enabled',
+    'versioning_enabled',
+    'logging_enabled',
+    'sensitive_naming',
+    'has_tags'
+]
+BIT_WEIGHTS = 1 << np.arange(len(FEATURE_COLUMNS))
+
+@functools.lru_cache(maxsize=1)
+def get_model():
+    """Load the trained model once, later calls reuse it"""
+    return joblib.load(MODEL_PATH)
+
+@functools.lru_cache(maxsize=1)
+def get_lookup_table():
+    """
+    The loaded model's probabilities for all 2**6 binary inputs
+    
+    Built from get_model() on first use, so it always matches the model.
+    Row i is the input whose feature j equals bit j of i.
+    """
+    n_features = len(FEATURE_COLUMNS)
+    grid = ((np.arange(2 ** n_features)[:, None] >> np.arange(n_features)) & 1).astype(np.float32)
+    return get_model().predict_proba(grid)
 
 def predict_risk(features):
     """
@@ -12,35 +43,49 @@ def predict_risk(features):
         prediction and risk score
     """
     
-    # Load trained model
-    model = joblib.load('models/random_forest_v1.pkl')
+    return predict_risk_batch([features])[0]
+
+def predict_risk_batch(features_list):
+    """
+    Predict risk for many resources with a single model call
     
-    # Convert features to DataFrame (model expects this format)
-    feature_columns = [
-        'public_access',
-        'encryption_enabled',
-        'versioning_enabled',
-        'logging_enabled',
-        'sensitive_naming',
-        'has_tags'
-    ]
+    Args:
+        features_list: List of feature dictionaries
     
-    # Create DataFrame with one row
-    X = pd.DataFrame([features], columns=feature_columns)
+    Returns:
+        List of predictions, same order as the input
+    """
     
-    # Predict
-    prediction = model.predict(X)[0]  # 0 or 1
-    probability = model.predict_proba(X)[0]  # [prob_safe, prob_risky]
+    # One row per resource, in training column order. A plain float32 array
+    # (what the trees use internally) skips pandas construction and any
+    # conversion inside sklearn
+    X = np.empty((len(features_list), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for row, features in zip(X, features_list):
+        row[:] = [features[column] for column in FEATURE_COLUMNS]
     
-    risk_score = probability[1]  # Probability of being risky
+    # rows of [prob_safe, prob_risky]
+    if np.isin(X, (0, 1)).all():
+        # All flags are 0/1: the model's answer is precomputed, bit j of the
+        # row index is feature j
+        probabilities = get_lookup_table()[X.astype(np.int64) @ BIT_WEIGHTS]
+    else:
+        # Predict (one pass over the forest; predict() would walk it again)
+        probabilities = get_model().predict_proba(X)
     
-    decision = "RISKY" if prediction == 1 else "SAFE"
+    results = []
+    for probability in probabilities:
+        risk_score = probability[1]  # Probability of being risky
+        
+        # Same rule as model.predict(): argmax, ties go to SAFE
+        decision = "RISKY" if risk_score > 0.5 else "SAFE"
+        
+        results.append({
+            'decision': decision,
+            'risk_score': risk_score,
+            'confidence': max(probability)
+        })
     
-    return {
-        'decision': decision,
-        'risk_score': risk_score,
-        'confidence': max(probability)
-    }
+    return results
 
 # Test with examples
 if __name__ == '__main__':
@@ -3,21 +3,233 @@ Simple caching for LLM responses
 Reduces API costs and improves speed
 """
 
+import array
+import atexit
 import hashlib
+import io
 import json
+import mmap
 import os
-from datetime import datetime, timedelta
+import re
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# orjson reads and writes bytes directly and is several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dump_line(obj):
+    """One JSON line as bytes"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj) + '\n').encode('utf-8')
+
+# Optional: zstandard compresses the compacted snapshot (LLM text shrinks 3-5x)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_LEVEL = 3
+
+# What a damaged or unwritable cache file can raise; anything else is a bug
+IO_ERRORS = (OSError, ValueError) + ((zstandard.ZstdError,) if zstandard else ())
+
+def _loads(data):
+    return orjson.loads(data) if orjson else json.loads(bytes(data))
+
+def _read_lines(path):
+    """
+    Lines of a file as memoryview slices of an mmap
+    
+    Nothing is copied per line before parsing (orjson takes the view as
+    is), and the file is never held in memory as one string. Each view is
+    only valid until the next one is yielded.
+    """
+    
+    if os.path.getsize(path) == 0:
+        return  # empty files can't be mapped
+    
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            memoryview(mm) as view:
+        start = 0
+        while start < len(mm):
+            end = mm.find(b'\n', start)
+            if end == -1:
+                end = len(mm)
+            line = view[start:end]
+            try:
+                yield line
+            finally:
+                line.release()
+            start = end + 1
+
+# xxh3 hashes long prompts several times faster than hashlib; blake2b
+# (8-byte digest) is the stdlib fallback. Both give half of MD5's key length
+try:
+    import xxhash
+    
+    def default_hasher(data):
+        return xxhash.xxh3_64_hexdigest(data)
+except ImportError:
+    def default_hasher(data):
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+CACHE_FILE = 'llm_cache.jsonl'
+SNAPSHOT_FILE = CACHE_FILE + '.zst'  # compacted entries, zstd only
+
+# Runs of spaces, tabs and newlines; collapsed when normalizing keys
+WHITESPACE_RE = re.compile(r'\s+')
+WHITESPACE_BYTES_RE = re.compile(rb'\s+')
+
+# Appended lines between full rewrites of the file (drops overwritten lines)
+COMPACT_EVERY = 500
+
+# Least recently used entries beyond this are evicted
+MAX_ENTRIES = 10_000
+
+# Expired entries found by get() are removed in one sweep once this many are
+# waiting or SWEEP_INTERVAL seconds have passed, on the next set()
+SWEEP_BATCH = 128
+SWEEP_INTERVAL = 60
+
+def _write_atomic(path, write):
+    """
+    Call write(f) on a temporary file, fsync it, then rename it to path
+    
+    The temporary name is unique, so compactions running at the same time
+    (threads, other worker processes, atexit) never write the same file.
+    """
+    
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# Live caches, compacted once at interpreter exit. Weak, so an instance
+# that goes away isn't kept alive just to be flushed
+_instances = weakref.WeakSet()
+
+@atexit.register
+def _compact_all():
+    for cache in list(_instances):
+        cache._compact_if_dirty()
 
 class SimpleCache:
     """In-memory cache with file persistence"""
     
-    def __init__(self, cache_dir='cache'):
+    def __init__(self, cache_dir='cache', hasher=default_hasher, max_entries=MAX_ENTRIES,
+                 normalize_whitespace=False):
         self.cache_dir = cache_dir
-        self.cache = {}
+        self.max_entries = max_entries
+        self._reset_entries()
+        
+        # Keys that differ only in whitespace (re-indented Terraform, trailing
+        # newlines) share an entry. Exact otherwise: a similarity threshold
+        # could hand a private bucket the answer for a public one
+        self.normalize_whitespace = normalize_whitespace
+        
         self.max_age_hours = 24
+        self.max_age_seconds = self.max_age_hours * 3600
+        
+        # bytes -> hex string; swappable (e.g. in tests)
+        self.hasher = hasher
+        
+        # The file is an append-only log, one {cache_key: entry} line per set.
+        # With zstandard, compaction moves the entries to a compressed
+        # snapshot and empties the log
+        self.cache_file = os.path.join(cache_dir, CACHE_FILE)
+        self.snapshot_file = os.path.join(cache_dir, SNAPSHOT_FILE)
+        self._appends = 0
+        
+        self._expired_pending = set()
+        self._last_sweep = time.time()
+        
+        # Directory and file are only touched on first use, so importing
+        # this module (and the global llm_cache) costs no disk I/O
+        self._loaded = False
+        
+        # One lock for the entries and the files: analyze_batch and
+        # analyze_async share the global cache between threads. Reentrant,
+        # since set() sweeps and saves while holding it
+        self._lock = threading.RLock()
+        
+        # Leave a compact file behind on normal interpreter exit
+        _instances.add(self)
+    
+    def _reset_entries(self):
+        """
+        Empty the entry storage
+        
+        Entries are stored as parallel arrays indexed by slot: values in a
+        list, creation times in a contiguous array of doubles (8 bytes per
+        entry instead of a float object). _index maps cache key -> slot in
+        least recently used first order; freed slots are reused and their
+        time is set to +inf so they never count as expired.
+        """
+        
+        self._index = OrderedDict()
+        self._values = []
+        self._created = array.array('d')
+        self._free_slots = []
+    
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._index)
+    
+    def _put(self, cache_key, value, created):
+        """Insert or overwrite an entry as the most recently used"""
+        
+        slot = self._index.get(cache_key)
+        if slot is not None:
+            self._index.move_to_end(cache_key)
+        elif self._free_slots:
+            slot = self._free_slots.pop()
+            self._index[cache_key] = slot
+        else:
+            slot = len(self._values)
+            self._values.append(None)
+            self._created.append(0.0)
+            self._index[cache_key] = slot
+        
+        self._values[slot] = value
+        self._created[slot] = created
+    
+    def _remove(self, cache_key):
+        self._release(self._index.pop(cache_key))
+    
+    def _evict_overflow(self):
+        while len(self._index) > self.max_entries:
+            _, slot = self._index.popitem(last=False)
+            self._release(slot)
+    
+    def _release(self, slot):
+        self._values[slot] = None
+        self._created[slot] = float('inf')
+        self._free_slots.append(slot)
+    
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
         
         # Create cache directory
-        os.makedirs(cache_dir, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
         
         # Load existing cache
         self._load_cache()
@@ -26,86 +238,199 @@ class SimpleCache:
         """Get cached value if exists and not expired"""
         
         cache_key = self._hash_key(key)
-        
-        if cache_key in self.cache:
-            entry = self.cache[cache_key]
+        with self._lock:
+            self._ensure_loaded()
             
-            # Check expiration
-            created = datetime.fromisoformat(entry['created'])
-            age = datetime.now() - created
+            slot = self._index.get(cache_key)
+            if slot is None:
+                return None
             
-            if age < timedelta(hours=self.max_age_hours):
-                return entry['value']
-            else:
-                # Expired, remove
-                del self.cache[cache_key]
-        
-        return None
+            # Check expiration (times are time.time() floats)
+            if time.time() - self._created[slot] < self.max_age_seconds:
+                self._index.move_to_end(cache_key)
+                return self._values[slot]
+            
+            # Expired, removed by the next sweep
+            self._expired_pending.add(cache_key)
+            return None
     
     def set(self, key, value):
         """Store value in cache"""
         
         cache_key = self._hash_key(key)
+        with self._lock:
+            self._ensure_loaded()
+            
+            created = time.time()
+            self._put(cache_key, value, created)
+            self._evict_overflow()
+            
+            # Persist to disk: one appended line, the full file only now and then
+            self._append_entry(cache_key, {'value': value, 'created': created})
+            if not self._maybe_sweep() and self._appends >= COMPACT_EVERY:
+                self._save_cache()
+    
+    def _maybe_sweep(self):
+        """Drop the expired entries get() has seen and persist once; True if it ran"""
+        
+        if not self._expired_pending:
+            return False
+        if (len(self._expired_pending) < SWEEP_BATCH
+                and time.time() - self._last_sweep < SWEEP_INTERVAL):
+            return False
         
-        self.cache[cache_key] = {
-            'value': value,
-            'created': datetime.now().isoformat()
-        }
+        now = time.time()
+        for cache_key in self._expired_pending:
+            slot = self._index.get(cache_key)
+            # Skip keys that were set again since get() saw them expired
+            if slot is not None and now - self._created[slot] >= self.max_age_seconds:
+                self._remove(cache_key)
         
-        # Persist to disk
+        self._expired_pending.clear()
+        self._last_sweep = now
         self._save_cache()
+        return True
     
     def _hash_key(self, key):
-        """Generate hash for cache key"""
-        return hashlib.md5(str(key).encode()).hexdigest()
+        """
+        Generate hash for cache key
+        
+        bytes keys are hashed as they are and str keys are encoded once
+        (no str() round trip); anything else is hashed by its str().
+        """
+        
+        if isinstance(key, bytes):
+            data = key
+            if self.normalize_whitespace:
+                data = WHITESPACE_BYTES_RE.sub(b' ', data).strip()
+            return self.hasher(data)
+        
+        text = key if isinstance(key, str) else str(key)
+        if self.normalize_whitespace:
+            text = WHITESPACE_RE.sub(' ', text).strip()
+        return self.hasher(text.encode('utf-8', 'surrogatepass'))
     
     def _load_cache(self):
-        """Load cache from disk"""
+        """
+        Load cache from disk
+        
+        The snapshot (if any) comes first, then the log. Later lines replace
+        earlier ones and count as more recently used, so the LRU order saved
+        by _save_cache carries over a restart.
+        """
         
-        cache_file = os.path.join(self.cache_dir, 'llm_cache.json')
+        sources = []
+        if zstandard and os.path.exists(self.snapshot_file):
+            sources.append(self._read_snapshot_lines)
+        if os.path.exists(self.cache_file):
+            sources.append(lambda: _read_lines(self.cache_file))
         
-        if os.path.exists(cache_file):
+        for source in sources:
+            # A damaged file loses only what comes after the damage
             try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    self.cache = json.load(f)
-            except:
-                self.cache = {}
+                for line in source():
+                    self._load_line(line)
+            except IO_ERRORS as e:
+                print(f"⚠️  Cache file partly unreadable, keeping {len(self._index)} entries: {e}")
+        
+        self._evict_overflow()
+    
+    def _load_line(self, line):
+        try:
+            loaded = _loads(line)
+        except ValueError:
+            return  # torn last line from a crash
+        
+        if not isinstance(loaded, dict):
+            return
+        
+        for cache_key, entry in loaded.items():
+            # Entries from before epoch timestamps have ISO strings
+            if not isinstance(entry, dict) or not isinstance(entry.get('created'), (int, float)):
+                continue
+            self._put(cache_key, entry.get('value'), entry['created'])
+    
+    def _read_snapshot_lines(self):
+        with open(self.snapshot_file, 'rb') as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+            yield from io.BufferedReader(reader)
+    
+    def _append_entry(self, cache_key, entry):
+        """Write a single entry to the end of the cache file"""
+        
+        try:
+            with open(self.cache_file, 'ab') as f:
+                f.write(_dump_line({cache_key: entry}))
+            self._appends += 1
+        except OSError as e:
+            print(f"⚠️  Could not write cache entry: {e}")
     
     def _save_cache(self):
-        """Save cache to disk"""
+        """
+        Rewrite the cache file with only the current entries
         
-        cache_file = os.path.join(self.cache_dir, 'llm_cache.json')
+        The new file is written and fsynced next to the old one, then
+        renamed over it, so a crash leaves either the old or the new file
+        complete, never a truncated one.
+        """
+        
+        lines = (
+            _dump_line({cache_key: {'value': self._values[slot], 'created': self._created[slot]}})
+            for cache_key, slot in self._index.items()
+        )
         
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2)
-        except:
-            pass
+            if zstandard:
+                def write_snapshot(f):
+                    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+                    with compressor.stream_writer(f, closefd=False) as writer:
+                        for line in lines:
+                            writer.write(line)
+                
+                _write_atomic(self.snapshot_file, write_snapshot)
+                # Log is in the snapshot now (a crash before this only
+                # leaves duplicate lines, which load harmlessly). Replaced,
+                # not truncated: another process may still have it mapped
+                _write_atomic(self.cache_file, lambda f: None)
+            else:
+                _write_atomic(self.cache_file, lambda f: f.writelines(lines))
+                # A snapshot left by a zstandard install would shadow the log
+                if os.path.exists(self.snapshot_file):
+                    os.remove(self.snapshot_file)
+            self._appends = 0
+        except IO_ERRORS as e:
+            print(f"⚠️  Could not save cache: {e}")
+    
+    def _compact_if_dirty(self):
+        with self._lock:
+            if self._appends:
+                self._save_cache()
     
     def clear(self):
         """Clear all cache"""
-        self.cache = {}
-        self._save_cache()
+        with self._lock:
+            self._ensure_loaded()
+            self._reset_entries()
+            self._expired_pending.clear()
+            self._save_cache()
     
     def stats(self):
         """Get cache statistics"""
         
-        total = len(self.cache)
-        
-        # Count expired
-        expired = 0
-        for entry in self.cache.values():
-            created = datetime.fromisoformat(entry['created'])
-            age = datetime.now() - created
-            if age >= timedelta(hours=self.max_age_hours):
-                expired += 1
-        
-        return {
-            'total_entries': total,
-            'valid_entries': total - expired,
-            'expired_entries': expired,
-            'cache_dir': self.cache_dir
-        }
+        with self._lock:
+            self._ensure_loaded()
+            total = len(self._index)
+            
+            # Count expired: created at or before the cutoff (free slots are +inf)
+            cutoff = time.time() - self.max_age_seconds
+            expired = sum(1 for t in self._created if t <= cutoff)
+            
+            return {
+                'total_entries': total,
+                'valid_entries': total - expired,
+                'expired_entries': expired,
+                'cache_dir': self.cache_dir
+            }
 
 # Global cache instance
-llm_cache = SimpleCache()
\ No newline at end of file
+llm_cache = SimpleCache(normalize_whitespace=True)
\ No newline at end of file
@@ -4,13 +4,32 @@ Tests if we can access AWS Bedrock and Claude models
 """
 
 import boto3
+import functools
+import io
 import os
 import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+@functools.lru_cache(maxsize=None)
+def _session():
+    """One boto3 session, so its loaded service models are shared by both clients"""
+    return boto3.session.Session(
+        region_name=os.getenv('AWS_REGION', 'us-east-1'),
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+    )
+
+@functools.lru_cache(maxsize=None)
+def _bedrock(service):
+    """Client for 'bedrock' or 'bedrock-runtime', created once per service"""
+    return _session().client(service)
+
 def test_bedrock_access():
     """
     Test if we can access AWS Bedrock
@@ -25,12 +44,7 @@ def test_bedrock_access():
         # Create Bedrock client
         print("🔌 Attempting to connect to AWS Bedrock...")
         
-        bedrock = boto3.client(
-            'bedrock',
-            region_name=os.getenv('AWS_REGION', 'us-east-1'),
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
+        bedrock = _bedrock('bedrock')
         
         print("✅ AWS Bedrock client created successfully\n")
         
@@ -105,12 +119,7 @@ def test_invoke_bedrock():
     """
     
     try:
-        bedrock_runtime = boto3.client(
-            'bedrock-runtime',
-            region_name=os.getenv('AWS_REGION', 'us-east-1'),
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
+        bedrock_runtime = _bedrock('bedrock-runtime')
         
         # Simple test prompt
         test_prompt = "Say hello in exactly 5 words."
@@ -195,6 +204,28 @@ def check_openai_fallback():
         print("   Add OPENAI_API_KEY to .env file for fallback")
         return False
 
+class _ThreadOutput:
+    """sys.stdout stand-in that sends each capturing thread's prints to its own buffer"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        return getattr(self.local, 'buffer', self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
+def _run_captured(output, check):
+    """Run check() with its prints collected; returns (result, printed text)"""
+    
+    output.local.buffer = io.StringIO()
+    try:
+        return check(), output.local.buffer.getvalue()
+    finally:
+        del output.local.buffer
+
 def display_summary():
     """Display test summary and next steps"""
     
@@ -202,8 +233,21 @@ def display_summary():
     print("  TEST SUMMARY")
     print("="*70 + "\n")
     
-    bedrock_available = test_bedrock_access()
-    openai_available = check_openai_fallback()
+    # Both checks mostly wait on the network, so run them at the same time
+    # and print each one's output in order afterwards
+    output = _ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            bedrock_future = executor.submit(_run_captured, output, test_bedrock_access)
+            openai_future = executor.submit(_run_captured, output, check_openai_fallback)
+            bedrock_available, bedrock_log = bedrock_future.result()
+            openai_available, openai_log = openai_future.result()
+    finally:
+        sys.stdout = output.stream
+    
+    print(bedrock_log, end='')
+    print(openai_log, end='')
     
     print("\n" + "="*70)
     print("  RECOMMENDATION")
@@ -0,0 +1,131 @@
+"""
+Tests for the LLM response cache and its on-disk log
+
+"""
+
+import gc
+import os
+import threading
+import weakref
+import pytest
+import sys
+sys.path.append('src')
+
+import utils.cache as simple_cache
+from utils.cache import SimpleCache
+
+def reopen(cache, **kwargs):
+    """A new cache on the same directory, as after a restart"""
+    return SimpleCache(cache_dir=cache.cache_dir, **kwargs)
+
+@pytest.fixture
+def cache(tmp_path):
+    return SimpleCache(cache_dir=str(tmp_path))
+
+def test_get_after_reload(cache):
+    cache.set('prompt one', {'intent': 'accidental'})
+    cache.set(b'prompt two', 'raw')
+    
+    reloaded = reopen(cache)
+    
+    assert reloaded.get('prompt one') == {'intent': 'accidental'}
+    assert reloaded.get(b'prompt two') == 'raw'
+    assert reloaded.get('missing') is None
+
+def test_overwrite_keeps_latest(cache):
+    cache.set('key', 1)
+    cache.set('key', 2)
+    
+    assert reopen(cache).get('key') == 2
+
+def test_lru_order_survives_restart(cache):
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key)
+    cache.get('a')       # a is now the most recently used
+    cache._save_cache()  # compaction writes entries in LRU order
+    
+    reloaded = reopen(cache, max_entries=3)
+    reloaded.set('d', 'd')
+    
+    assert reloaded.get('b') is None, "Least recently used entry should be evicted"
+    assert reloaded.get('a') == 'a'
+    assert reloaded.get('c') == 'c'
+
+def test_expired_entries_swept(cache, monkeypatch):
+    monkeypatch.setattr(simple_cache, 'SWEEP_BATCH', 1)
+    cache.set('old', 'stale')
+    
+    cache.max_age_seconds = 0
+    assert cache.get('old') is None, "Expired entry should not be returned"
+    assert cache.stats()['expired_entries'] == 1
+    
+    # The next set() sweeps and rewrites the file without the expired entry
+    cache.set('new', 'fresh')
+    
+    assert len(cache) == 1
+    reloaded = reopen(cache)
+    assert reloaded.get('old') is None
+    assert reloaded.get('new') == 'fresh'
+
+def test_torn_last_line(cache):
+    cache.set('kept', 'value')
+    with open(cache.cache_file, 'ab') as f:
+        f.write(b'{"abc": {"value": "cut of')  # crash mid-write
+    
+    reloaded = reopen(cache)
+    
+    assert reloaded.get('kept') == 'value'
+    assert len(reloaded) == 1
+
+def test_snapshot_then_log_replay(cache):
+    cache.set('a', 'first')
+    cache.set('b', 'b')
+    cache._save_cache()
+    if simple_cache.zstandard:
+        assert os.path.exists(cache.snapshot_file)
+        assert os.path.getsize(cache.cache_file) == 0, "Compaction should empty the log"
+    
+    # Appended after the snapshot: replayed on top of it
+    cache.set('a', 'second')
+    cache.set('c', 'c')
+    
+    reloaded = reopen(cache)
+    
+    assert reloaded.get('a') == 'second'
+    assert reloaded.get('b') == 'b'
+    assert reloaded.get('c') == 'c'
+    assert len(reloaded) == 3
+
+def test_concurrent_set_and_compact(cache, monkeypatch):
+    monkeypatch.setattr(simple_cache, 'COMPACT_EVERY', 10)
+    cache.max_entries = 20
+    errors = []
+    
+    def worker(n):
+        try:
+            for i in range(200):
+                cache.set(f'{n}-{i}', i)
+                cache.get(f'{n}-{i - 1}')
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert len(reopen(cache, max_entries=20)) == 20
+
+def test_exit_hook_holds_no_reference(tmp_path):
+    cache = SimpleCache(cache_dir=str(tmp_path))
+    cache.set('key', 'value')
+    ref = weakref.ref(cache)
+    
+    simple_cache._compact_all()  # what runs at interpreter exit
+    assert cache._appends == 0, "Exit hook should compact live caches"
+    
+    del cache
+    gc.collect()
+    assert ref() is None, "Exit hook should not keep the cache alive"
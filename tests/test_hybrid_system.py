@@ -8,33 +8,20 @@ import sys
 sys.path.append('src')
 
 from api.hybrid_analyzer import HybridAnalyzer
+from llm.llm_analyzer import LLMAnalyzer
 
 # Initialize analyzer once for all tests
 analyzer = HybridAnalyzer()
 
-class TestHybridAnalyzer:
-    """Test hybrid ML+LLM system"""
-    
-    def test_high_risk_public_customer_data(self):
-        """Should BLOCK public customer data"""
-        
-        code = '''
+# Terraform for the TestHybridAnalyzer cases, analyzed once per module
+HYBRID_CODE = {
+    'public_customer_data': '''
 resource "aws_s3_bucket" "customer_db" {
   bucket = "prod-customer-database"
   acl    = "public-read"
 }
-'''
-        
-        result = analyzer.analyze(code)
-        
-        assert result['decision'] == 'BLOCK', "Should block public customer data"
-        assert result['risk_score'] > 0.7, "Risk score should be high"
-        assert result['intent'] in ['ACCIDENTAL', 'UNCERTAIN'], "Should detect as accidental"
-    
-    def test_safe_encrypted_bucket(self):
-        """Should ALLOW secure configuration"""
-        
-        code = '''
+''',
+    'safe_encrypted': '''
 resource "aws_s3_bucket" "secure_data" {
   bucket = "company-logs"
   acl    = "private"
@@ -47,17 +34,8 @@ resource "aws_s3_bucket" "secure_data" {
     }
   }
 }
-'''
-        
-        result = analyzer.analyze(code)
-        
-        assert result['decision'] == 'ALLOW', "Should allow safe configuration"
-        assert result['risk_score'] < 0.3, "Risk score should be low"
-    
-    def test_intentional_public_website(self):
-        """Should WARN (not BLOCK) for intentional public website"""
-        
-        code = '''
+''',
+    'public_website': '''
 resource "aws_s3_bucket" "marketing_site" {
   bucket = "company-public-website"
   acl    = "public-read"
@@ -70,18 +48,8 @@ resource "aws_s3_bucket" "marketing_site" {
     Purpose = "Marketing website"
   }
 }
-'''
-        
-        result = analyzer.analyze(code)
-        
-        # Should be WARN or ALLOW, NOT BLOCK
-        assert result['decision'] != 'BLOCK', "Should not block intentional website"
-        assert result['intent'] == 'INTENTIONAL', "Should detect as intentional"
-    
-    def test_ssh_open_to_world(self):
-        """Should BLOCK SSH open to 0.0.0.0/0"""
-        
-        code = '''
+''',
+    'ssh_open': '''
 resource "aws_security_group" "ssh" {
   name = "ssh_access"
   
@@ -92,24 +60,87 @@ resource "aws_security_group" "ssh" {
     cidr_blocks = ["0.0.0.0/0"]
   }
 }
-'''
-        
-        result = analyzer.analyze(code)
-        
-        assert result['decision'] == 'BLOCK', "Should block SSH open to world"
-        assert result['risk_score'] > 0.6, "Risk should be high"
-    
-    def test_ml_llm_fusion(self):
-        """Test that ML and LLM scores are being fused"""
-        
-        code = '''
+''',
+    'public_test_bucket': '''
 resource "aws_s3_bucket" "test" {
   bucket = "test-bucket"
   acl    = "public-read"
 }
+''',
+    'unencrypted_private': '''
+resource "aws_s3_bucket" "data" {
+  bucket = "unencrypted-bucket"
+  acl    = "private"
+}
+''',
+}
+
+# Inputs of the edge-case and performance tests
+FX_INVALID = "this is not terraform code"
+
+FX_MULTIPLE_RESOURCES = '''
+resource "aws_s3_bucket" "bucket1" {
+  bucket = "bucket-one"
+}
+
+resource "aws_s3_bucket" "bucket2" {
+  bucket = "bucket-two"
+}
 '''
+
+FX_PRIVATE_BUCKET = '''
+resource "aws_s3_bucket" "test" {
+  bucket = "test"
+  acl    = "private"
+}
+'''
+
+# Cases the rule-based fallback can't decide: skipped when no provider is configured
+NEEDS_LLM = pytest.mark.skipif(not analyzer.llm.enabled, reason="needs a configured LLM provider")
+
+# (HYBRID_CODE name, expected outcome) for TestHybridAnalyzer.test_decision
+DECISION_CASES = [
+    # Public customer data
+    pytest.param("public_customer_data", {"decision": "BLOCK", "risk_min": 0.7, "intents": ["ACCIDENTAL", "UNCERTAIN"]},
+                 id="public_customer_data"),
+    # Secure configuration
+    pytest.param("safe_encrypted", {"decision": "ALLOW", "risk_max": 0.3}, id="safe_encrypted", marks=NEEDS_LLM),
+    # Intentional public website: WARN or ALLOW, NOT BLOCK
+    pytest.param("public_website", {"not_decision": "BLOCK", "intents": ["INTENTIONAL"]}, id="public_website",
+                 marks=NEEDS_LLM),
+    # SSH open to 0.0.0.0/0
+    pytest.param("ssh_open", {"decision": "BLOCK", "risk_min": 0.6}, id="ssh_open", marks=NEEDS_LLM),
+]
+
+@pytest.fixture(scope="module")
+def analyses():
+    """analyzer.analyze() result for each HYBRID_CODE entry"""
+    return {name: analyzer.analyze(code) for name, code in HYBRID_CODE.items()}
+
+class TestHybridAnalyzer:
+    """Test hybrid ML+LLM system"""
+    
+    @pytest.mark.parametrize("name,expect", DECISION_CASES)
+    def test_decision(self, analyses, name, expect):
+        """Decision, risk range and intent for each configuration"""
+        
+        result = analyses[name]
+        
+        if 'decision' in expect:
+            assert result['decision'] == expect['decision'], f"Should {expect['decision']} {name}"
+        if 'not_decision' in expect:
+            assert result['decision'] != expect['not_decision'], f"Should not {expect['not_decision']} {name}"
+        if 'risk_min' in expect:
+            assert result['risk_score'] > expect['risk_min'], "Risk score should be high"
+        if 'risk_max' in expect:
+            assert result['risk_score'] < expect['risk_max'], "Risk score should be low"
+        if 'intents' in expect:
+            assert result['intent'] in expect['intents'], f"Intent should be one of {expect['intents']}"
+    
+    def test_ml_llm_fusion(self, analyses):
+        """Test that ML and LLM scores are being fused"""
         
-        result = analyzer.analyze(code)
+        result = analyses['public_test_bucket']
         
         # Both scores should exist
         assert 'ml_score' in result, "ML score should be present"
@@ -125,17 +156,10 @@ resource "aws_s3_bucket" "test" {
         
         assert min_score <= final_score <= max_score, "Final score should be fusion of ML and LLM"
     
-    def test_recommendations_generated(self):
+    def test_recommendations_generated(self, analyses):
         """Test that recommendations are provided"""
         
-        code = '''
-resource "aws_s3_bucket" "data" {
-  bucket = "unencrypted-bucket"
-  acl    = "private"
-}
-'''
-        
-        result = analyzer.analyze(code)
+        result = analyses['unencrypted_private']
         
         # Should have problems identified
         assert 'problems' in result, "Problems should be identified"
@@ -154,29 +178,95 @@ class TestEdgeCases:
     def test_invalid_terraform(self):
         """Should handle invalid Terraform syntax"""
         
-        code = "this is not terraform code"
-        result = analyzer.analyze(code)
+        result = analyzer.analyze(FX_INVALID)
         
         assert 'error' in result, "Should return error for invalid code"
     
     def test_multiple_resources(self):
         """Should analyze first resource when multiple present"""
         
-        code = '''
-resource "aws_s3_bucket" "bucket1" {
-  bucket = "bucket-one"
-}
-
-resource "aws_s3_bucket" "bucket2" {
-  bucket = "bucket-two"
-}
-'''
-        
-        result = analyzer.analyze(code)
+        result = analyzer.analyze(FX_MULTIPLE_RESOURCES)
         
         assert 'decision' in result, "Should analyze successfully"
         assert result['resource']['name'] == 'bucket1', "Should analyze first resource"
 
+class TestBatch:
+    """analyze_batch and the result cache"""
+    
+    def test_matches_single_analysis(self):
+        codes = [HYBRID_CODE['public_customer_data'], HYBRID_CODE['safe_encrypted']]
+        
+        results = HybridAnalyzer().analyze_batch(codes)
+        
+        assert results == [analyzer.analyze(code) for code in codes]
+    
+    def test_duplicate_codes(self):
+        batch = HybridAnalyzer()
+        codes = [HYBRID_CODE['public_customer_data'], FX_PRIVATE_BUCKET, HYBRID_CODE['public_customer_data']]
+        
+        results = batch.analyze_batch(codes)
+        
+        assert len(results) == 3
+        assert results[0] == results[2], "Duplicates should get the same result"
+        assert results[0] is not results[2], "Duplicates should get separate copies"
+        assert results[1]['resource'] != results[0]['resource'], "Order should be preserved"
+    
+    def test_unparsable_config(self):
+        codes = [HYBRID_CODE['public_customer_data'], FX_INVALID, FX_PRIVATE_BUCKET]
+        
+        results = HybridAnalyzer().analyze_batch(codes)
+        
+        assert 'decision' in results[0]
+        assert results[1] == {"error": "No resources found"}
+        assert 'decision' in results[2], "One bad config should not fail the batch"
+    
+    def test_cached_copy_not_mutated(self):
+        batch = HybridAnalyzer()
+        code = HYBRID_CODE['public_customer_data']
+        
+        # app.py tags each batch result with its config_id
+        first = batch.analyze_batch([code])[0]
+        first['config_id'] = 'config_0'
+        complete = batch.analyze_complete(code)
+        complete['config_id'] = 'config_1'
+        
+        # Nested values are copies too
+        complete['resource']['name'] = 'renamed'
+        complete['concerns'].append('added by caller')
+        complete['problems'].append('added by caller')
+        
+        again = batch.analyze_complete(code)
+        assert 'config_id' not in batch.analyze_batch([code])[0]
+        assert 'config_id' not in again
+        assert again['resource']['name'] != 'renamed'
+        assert 'added by caller' not in again['concerns']
+        assert 'added by caller' not in again['problems']
+
+class TestMLGate:
+    """Clear-cut ML scores are answered without the LLM"""
+    
+    @pytest.mark.parametrize("ml_score,public,intent", [(0.1, 0, 'INTENTIONAL'), (0.95, 1, 'ACCIDENTAL')])
+    def test_clear_score_skips_llm(self, ml_score, public, intent):
+        llm = LLMAnalyzer()
+        llm.enabled, llm.llm = True, None  # any LLM call would fail
+        features = {'public_access': public, 'encryption_enabled': 0, 'sensitive_naming': 1}
+        
+        result = llm.analyze_intent(FX_PRIVATE_BUCKET, 'test', features, ml_risk_score=ml_score)
+        
+        assert result['intent'] == intent
+        assert result['llm_risk_score'] == ml_score
+        assert 'not consulted' in result['reasoning']
+    
+    @pytest.mark.parametrize("ml_score,public", [(0.95, 1), (0.1, 1), (None, 0)])
+    def test_unclear_score_asks_llm(self, ml_score, public):
+        llm = LLMAnalyzer()
+        llm.enabled, llm.llm = True, None
+        features = {'public_access': public, 'encryption_enabled': 0, 'sensitive_naming': 0}
+        
+        result = llm.analyze_intent(FX_PRIVATE_BUCKET, 'test', features, ml_risk_score=ml_score)
+        
+        assert result['reasoning'].startswith('LLM error')
+
 # Performance tests
 class TestPerformance:
     """Test system performance"""
@@ -186,15 +276,8 @@ class TestPerformance:
         
         import time
         
-        code = '''
-resource "aws_s3_bucket" "test" {
-  bucket = "test"
-  acl    = "private"
-}
-'''
-        
         start = time.time()
-        result = analyzer.analyze(code)
+        result = analyzer.analyze(FX_PRIVATE_BUCKET)
         duration = time.time() - start
         
         assert duration < 10, f"Analysis took {duration}s, should be under 10s"